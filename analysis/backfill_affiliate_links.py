@@ -5,18 +5,14 @@ import os
 import asyncio
 from dotenv import load_dotenv
 from sqlmodel import select, update
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import db
 from models.models import SmartSuggestion, MasterCard
 
 # === Load .env
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set in .env")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = db.session_factory()
 
 def build_affiliate_link(query: str) -> str:
     # This is a basic eBay affiliate template—customize as needed
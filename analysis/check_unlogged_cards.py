@@ -3,25 +3,23 @@
 
 import os
 import asyncio
+import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 from sqlmodel import SQLModel, select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import db
 from models import MasterCard, DailyPriceLog
 from scraper import parse_ebay_sold_page
+import response_cache
 from utils import filter_outliers, calculate_median, calculate_average
 
 # === Load environment variables
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
-
 # === Async database setup
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = db.session_factory()
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
@@ -104,4 +102,8 @@ async def run_scraper_for_unlogged():
 
 # === Entry point
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", action="store_true", help="Re-parse stored eBay pages from the response cache without touching the network")
+    args = parser.parse_args()
+    response_cache.set_replay(args.replay)
     asyncio.run(run_scraper_for_unlogged())
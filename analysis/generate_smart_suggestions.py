@@ -5,19 +5,14 @@ import asyncio
 import os
 from dotenv import load_dotenv
 from sqlmodel import SQLModel, select, delete
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import db
 from models import MasterCard, TrendTracker, SmartSuggestion
 
 # === Load .env config ===
 load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = db.session_factory()
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
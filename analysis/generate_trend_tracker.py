@@ -5,21 +5,18 @@ import asyncio
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from sqlmodel import SQLModel, select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+import db
 from models import TrendTracker
 
 import os
 
 # === Load environment
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set in .env")
 
 # === DB setup
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = db.session_factory()
 
 # === Outlier filter using IQR
 def filter_outliers_iqr(prices):
@@ -43,7 +40,7 @@ async def generate_trend_tracker():
                    m.card_name, m.set_name, m.tier
             FROM dailypricelog d
             JOIN mastercard m ON d.unique_id = m.unique_id
-            WHERE d.sold_date::date >= :cutoff 
+            WHERE d.sold_date >= :cutoff 
               AND m.tier::text != '4'
             ORDER BY d.unique_id, d.sold_date DESC
         """), {"cutoff": cutoff_date})
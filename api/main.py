@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Query, HTTPException, status, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from sqlmodel import SQLModel, select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlmodel import select
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from typing import List, Optional, Any, Dict
 from datetime import datetime, timedelta
@@ -11,6 +12,8 @@ import os
 import httpx
 import asyncio
 
+import db
+from migrate import load_migrations
 from models.models import MasterCard
 from batch_manager import BatchManager
 from archive.scraper_launcher import ScraperLauncher
@@ -35,12 +38,8 @@ app.add_middleware(
 )
 
 # === Database Setup ===
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set in environment.")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+engine = db.async_engine()
+async_session = db.session_factory()
 
 async def get_db_session() -> AsyncSession:
     async with async_session() as session:
@@ -48,9 +47,23 @@ async def get_db_session() -> AsyncSession:
 
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-    print("✅ Database initialized.")
+    # Schema changes ship as migrations (python migrate.py up); boot only reports drift
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version FROM schema_migrations"))
+            applied = {row[0] for row in result.fetchall()}
+        pending = [f"{version}_{name}" for version, name, _, _ in load_migrations() if version not in applied]
+    except Exception as e:
+        print(f"⚠️ Could not check schema migrations: {e}")
+        return
+    if pending:
+        print(f"⚠️ {len(pending)} schema migrations pending: {', '.join(pending)}")
+    else:
+        print("✅ Database schema up to date.")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await db.dispose_async_engines()
 
 # === API Key Middleware ===
 API_KEY = os.getenv("API_KEY")
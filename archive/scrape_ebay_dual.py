@@ -2,228 +2,324 @@ import os
 import sys
 import json
 import asyncio
+import argparse
 from datetime import datetime, timedelta
-from collections import defaultdict
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy import text
 import traceback
 
-# === Load .env and force async driver ===
+# === Load .env before the shared modules read their config ===
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
 # === Import shared logic ===
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import filter_outliers, calculate_median, calculate_average, parse_card_meta, is_valid_price, is_valid_title
-from scraper import parse_ebay_sold_page, parse_ebay_active_page
+from utils import filter_outliers, calculate_median, calculate_average, summarize_daily_prices, parse_card_meta, is_valid_price, is_valid_title, group_cards_by_query
+from scraper import async_parse_ebay_sold_history, async_parse_ebay_active_page, close_async_client, shutdown_parse_pool
+from rate_limiter import MAX_CONCURRENCY
+from pipeline import Pipeline, Stage
+from write_behind import WriteBehindBuffer, Write, resolved, POOL_SIZE as WRITE_POOL_SIZE
+import response_cache
+import db
+from watermark import Watermark, WATERMARK_COLUMNS, load_watermarks, watermark_rows
+from scrape_state import state_write
+from checkpoint import STAGES, PROGRESS_COLUMNS, run_id_for_cards, run_card_count, start_run, finish_run_if_complete
+from job_queue import (
+    LEASE_SECONDS, CLAIM_BATCH_SIZE, worker_id, claim_jobs,
+    heartbeat, complete_jobs, fail_job, queue_counts
+)
 
 # === DB setup ===
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+# Scrape output goes through the write-behind buffer on its own small pool;
+# the main pool only serves reads and checkpoint/heartbeat/queue bookkeeping
+async_session = db.session_factory()
+write_buffer = WriteBehindBuffer(db.session_factory("write", pool_size=WRITE_POOL_SIZE, max_overflow=0))
 
 # === Config ===
-MAX_SOLD_RESULTS = 120
 MAX_ACTIVE_RESULTS = 120
-CONCURRENT_LIMIT = 5
-CARD_DELAY = 0.75
+
+# Column order of the tuples prepare_sold/prepare_active build for bulk_insert/upsert_rows
+RAW_SOLD_DEBUG_COLUMNS = (
+    "unique_id", "query_used", "title", "price", "sold_date",
+    "url", "condition", "holo_type", "included", "reason_excluded"
+)
+RAW_ACTIVE_COLUMNS = ("unique_id", "query", "title", "price", "quantity", "date", "url", "condition", "holo_type")
+DAILY_COLUMNS = (
+    "unique_id", "sold_date", "median_price", "average_price",
+    "sale_count", "query_used", "urls_used", "trusted"
+)
+ACTIVE_DAILY_COLUMNS = (
+    "unique_id", "active_date", "median_price", "average_price",
+    "sale_count", "query_used", "card_number", "url_used", "lowest_price", "trusted"
+)
 
 print("\n🟢 scrape_ebay_dual.py started (cards_due.json mode)")
 
-# === Main scrape function per card ===
-async def scrape_card(unique_id, query, tier):
-    async with async_session() as session:
-        print(f"\n🃏 {unique_id} | {query} | Tier {tier}")
-        sold_success, active_success = False, False
+# === Fetch both sides once per distinct query ===
+async def fetch_sold(query, since=None):
+    try:
+        return await async_parse_ebay_sold_history(query, since=since)
+    except Exception as e:
+        print(f"❌ Sold fetch error for '{query}': {e}")
+        traceback.print_exc()
+        return None
 
-        # === SOLD listings ===
-        try:
-            sold_result = parse_ebay_sold_page(query, max_items=MAX_SOLD_RESULTS)
-            sold_raw = sold_result.get("raw", [])
-            sold_filtered = sold_result.get("filtered", [])
-            search_url = sold_result.get("url", "")
-
-            print(f"🔍 Sold raw: {len(sold_raw)} | Filtered: {len(sold_filtered)}")
-            if not sold_raw and not sold_filtered:
-                print(f"⚠️ No sold listings returned at all — possible eBay block or scrape fail for {unique_id}")
-
-            for item in sold_raw:
-                if not item.get("price") or not item.get("sold_date"):
-                    continue
-
-                # Determine inclusion and reason(s)
-                reasons = []
-                if not is_valid_price(item["price"]):
-                    reasons.append("price")
-                if not is_valid_title(item["title"], item["character"], item["card_number"]):
-                    reasons.append("title")
-                if datetime.strptime(item["sold_date"], "%Y-%m-%d").date() < (datetime.utcnow().date() - timedelta(days=90)):
-                    reasons.append("date")
-
-                included = not reasons
-                reason_excluded = None if included else ",".join(reasons)
-
-                # Insert into raw_ebay_sold_debug
-                await session.execute(text("""
-                    INSERT INTO raw_ebay_sold_debug (
-                        unique_id, query_used, title, price, sold_date,
-                        url, condition, holo_type, included, reason_excluded
-                    )
-                    VALUES (
-                        :uid, :query, :title, :price, :sold_date,
-                        :url, :condition, :holo, :included, :reason
-                    )
-                """), {
-                    "uid": unique_id,
-                    "query": query,
-                    "title": item["title"],
-                    "price": item["price"],
-                    "sold_date": datetime.strptime(item["sold_date"], "%Y-%m-%d").date(),
-                    "url": item["url"],
-                    "condition": item["condition"],
-                    "holo": item["holo_type"],
-                    "included": included,
-                    "reason": reason_excluded
-                })
-
-            await session.commit()
-
-            if not sold_filtered:
-                await session.execute(text("""
-                    INSERT INTO ebay_sold_nulls (unique_id, query_used, search_url, reason)
-                    VALUES (:uid, :query, :url, :reason)
-                """), {
-                    "uid": unique_id,
-                    "query": query,
-                    "url": search_url,
-                    "reason": "No filtered results"
-                })
-                await session.commit()
-            else:
-                grouped_by_date = defaultdict(list)
-                url_tracker = defaultdict(set)
-
-                for item in sold_filtered:
-                    dt = datetime.strptime(item["sold_date"], "%Y-%m-%d").date()
-                    grouped_by_date[dt].append(item["price"])
-                    url_tracker[dt].add(item["url"])
-
-                for sold_date, prices in grouped_by_date.items():
-                    filtered = filter_outliers(prices)
-                    if not filtered:
-                        print(f"⚠️ Sold prices filtered out completely for {unique_id} on {sold_date}")
-                        continue
-                    median_val = calculate_median(filtered)
-                    average = calculate_average(filtered)
-                    sale_count = len(filtered)
-                    urls = json.dumps(list(url_tracker[sold_date]))
-
-                    await session.execute(text("""
-                        INSERT INTO dailypricelog (
-                            unique_id, sold_date, median_price, average_price,
-                            sale_count, query_used, urls_used, trusted
-                        )
-                        VALUES (
-                            :uid, :dt, :median, :avg,
-                            :count, :query, :urls, TRUE
-                        )
-                    """), {
-                        "uid": unique_id,
-                        "dt": sold_date,
-                        "median": median_val,
-                        "avg": average,
-                        "count": sale_count,
-                        "query": query,
-                        "urls": urls
-                    })
-                await session.commit()
-            sold_success = True
+async def fetch_active(query):
+    try:
+        return await async_parse_ebay_active_page(query, max_items=MAX_ACTIVE_RESULTS)
+    except Exception as e:
+        print(f"❌ Active fetch error for '{query}': {e}")
+        traceback.print_exc()
+        return None
 
-        except Exception as e:
-            print(f"❌ Sold error for {unique_id}: {e}")
-            traceback.print_exc()
+async def skip_stage(result=None):
+    return result
 
-        # === ACTIVE listings ===
-        try:
-            active_result = parse_ebay_active_page(query, max_items=MAX_ACTIVE_RESULTS)
-            active_raw = active_result.get("raw", [])
-            active_filtered = active_result.get("filtered", [])
-            search_url = active_result.get("url", "")
-
-            print(f"🔍 Active raw: {len(active_raw)} | Filtered: {len(active_filtered)}")
-            if not active_raw and not active_filtered:
-                print(f"⚠️ No active listings returned at all — possible eBay block or scrape fail for {unique_id}")
-
-            prices = []
-            for item in active_raw:
-                if not item.get("price"):
-                    continue
-                await session.execute(text("""
-                    INSERT INTO raw_ebay_active (unique_id, query, title, price, quantity, date, url, condition, holo_type)
-                    VALUES (:uid, :query, :title, :price, 1, :date, :url, :condition, :holo)
-                """), {
-                    "uid": unique_id,
-                    "query": query,
-                    "title": item["title"],
-                    "price": item["price"],
-                    "date": datetime.utcnow().date(),
-                    "url": item["url"],
-                    "condition": item["condition"],
-                    "holo": item["holo_type"]
-                })
-                prices.append(item.get("price"))
-            await session.commit()
-
-            try:
-                filtered = filter_outliers(prices)
-                if filtered:
-                    median_val = calculate_median(filtered)
-                    average = calculate_average(filtered)
-                    best = min(filtered)
-                    count = len(filtered)
-                    _, digits = parse_card_meta(query)
-                    await session.execute(text("""
-                        INSERT INTO activedailypricelog (
-                            unique_id, active_date, median_price, average_price,
-                            sale_count, query_used, card_number, url_used,
-                            lowest_price, trusted
-                        )
-                        VALUES (
-                            :uid, :dt, :median, :avg,
-                            :count, :query, :card, :url,
-                            :low, TRUE
-                        )
-                    """), {
-                        "uid": unique_id,
-                        "dt": datetime.utcnow().date(),
-                        "median": median_val,
-                        "avg": average,
-                        "count": count,
-                        "query": query,
-                        "card": digits,
-                        "url": search_url,
-                        "low": best
-                    })
-                    await session.commit()
-                else:
-                    print(f"⚠️ No usable active prices for {unique_id} → skipping activedailypricelog insert")
-            except Exception as e:
-                print(f"❌ Error filtering active prices for {unique_id}: {e}")
-                traceback.print_exc()
-
-            active_success = True
+async def fetch_query(query, since=None, stages=STAGES):
+    # Sold pages and the active page are independent requests; run them side by side
+    return await asyncio.gather(
+        fetch_sold(query, since=since) if "sold" in stages else skip_stage(),
+        fetch_active(query) if "active" in stages else skip_stage()
+    )
 
-        except Exception as e:
-            print(f"❌ Active error for {unique_id}: {e}")
-            traceback.print_exc()
+# === SOLD side: raw debug rows, daily aggregates, watermark ===
+def prepare_sold(unique_id, query, sold_result, watermark=None):
+    """Everything write_sold stores, computed without a DB session. None if the fetch failed."""
+    if sold_result is None:
+        return None
+    sold_raw = sold_result.get("raw", [])
+    sold_filtered = sold_result.get("filtered", [])
+    search_url = sold_result.get("url", "")
+
+    print(f"🔍 Sold raw: {len(sold_raw)} | Filtered: {len(sold_filtered)}")
+    if not sold_raw and not sold_filtered:
+        print(f"⚠️ No sold listings returned at all — possible eBay block or scrape fail for {unique_id}")
+
+    # Only listings past this card's watermark get ingested
+    new_raw = watermark.new_listings(sold_raw) if watermark else sold_raw
+    new_urls = {item["url"] for item in new_raw}
+    if watermark:
+        print(f"🆕 New since {watermark.last_sold_date}: {len(new_raw)} of {len(sold_raw)}")
+
+    cutoff = datetime.utcnow().date() - timedelta(days=90)
+    debug_rows = []
+    for item in new_raw:
+        if not item.get("price") or not item.get("sold_date"):
+            continue
+
+        # Determine inclusion and reason(s)
+        sold_date = datetime.strptime(item["sold_date"], "%Y-%m-%d").date()
+        reasons = []
+        if not is_valid_price(item["price"]):
+            reasons.append("price")
+        if not is_valid_title(item["title"], item["character"], item["card_number"]):
+            reasons.append("title")
+        if sold_date < cutoff:
+            reasons.append("date")
+
+        debug_rows.append((
+            unique_id, query, item["title"], item["price"], sold_date,
+            item["url"], item["condition"], item["holo_type"], not reasons, ",".join(reasons) or None
+        ))
+
+    # Days with at least one new sale get their aggregate rebuilt from the full day
+    touched_days = {item["sold_date"] for item in sold_filtered if item["url"] in new_urls}
+    log_null = not sold_filtered and watermark is None
+    daily_rows = []
+    if not log_null and not touched_days:
+        print(f"💤 No new sold listings for {unique_id}")
+    elif not log_null:
+        for sold_date, day in summarize_daily_prices(sold_filtered, days=touched_days).items():
+            if day is None:
+                print(f"⚠️ Sold prices filtered out completely for {unique_id} on {sold_date}")
+                continue
+            daily_rows.append((
+                unique_id, sold_date, day["median"], day["average"],
+                day["count"], query, json.dumps(day["urls"]), True
+            ))
+
+    # Truncated history: the listings are real, but sales older than the last page read are
+    # still missing, so the watermark stays put and the next run reads past them again
+    truncated = sold_result.get("truncated", False)
+    if truncated:
+        print(f"⚠️ Sold history for {unique_id} hit the page limit; watermark not advanced")
+    return {
+        "search_url": search_url,
+        "debug_rows": debug_rows,
+        "log_null": log_null,
+        "daily_rows": daily_rows,
+        "truncated": truncated,
+        "watermark": None if truncated else (watermark or Watermark()).advanced(new_raw)
+    }
+
+def sold_writes(unique_id, query, plan):
+    writes = [Write("raw_ebay_sold_debug", RAW_SOLD_DEBUG_COLUMNS, plan["debug_rows"])]
+    if plan["log_null"]:
+        writes.append(Write(
+            "ebay_sold_nulls", ("unique_id", "query_used", "search_url", "reason"),
+            [(unique_id, query, plan["search_url"], "No filtered results")]
+        ))
+    else:
+        # Rebuilt days replace their earlier aggregate rather than adding a second row
+        writes.append(Write("dailypricelog", DAILY_COLUMNS, plan["daily_rows"], ("unique_id", "sold_date")))
+    writes.append(Write("ebay_sold_watermark", WATERMARK_COLUMNS, watermark_rows(unique_id, plan["watermark"]), ("unique_id",)))
+    if plan["truncated"]:
+        # Not a complete scrape: record the outcome without stamping last_sold_scrape
+        writes.append(state_write("sold", unique_id, ok=False, detail="truncated"))
+    else:
+        writes.append(state_write("sold", unique_id, detail="null" if plan["log_null"] else None))
+    return writes
+
+# === ACTIVE side: raw listings and today's active aggregate ===
+def prepare_active(unique_id, query, active_result):
+    """Everything write_active stores, computed without a DB session. None if the fetch failed."""
+    if active_result is None:
+        return None
+    active_raw = active_result.get("raw", [])
+    active_filtered = active_result.get("filtered", [])
+    search_url = active_result.get("url", "")
+
+    print(f"🔍 Active raw: {len(active_raw)} | Filtered: {len(active_filtered)}")
+    if not active_raw and not active_filtered:
+        print(f"⚠️ No active listings returned at all — possible eBay block or scrape fail for {unique_id}")
+
+    today = datetime.utcnow().date()
+    priced = [item for item in active_raw if item.get("price")]
+    raw_rows = [
+        (unique_id, query, item["title"], item["price"], 1, today, item["url"], item["condition"], item["holo_type"])
+        for item in priced
+    ]
+
+    summary = None
+    filtered = filter_outliers([item["price"] for item in priced])
+    if filtered:
+        _, digits = parse_card_meta(query)
+        summary = (
+            unique_id, today, calculate_median(filtered), calculate_average(filtered),
+            len(filtered), query, digits, search_url, min(filtered), True
+        )
+    else:
+        print(f"⚠️ No usable active prices for {unique_id} → skipping activedailypricelog insert")
+
+    return {"raw_rows": raw_rows, "summary": summary, "empty": not active_raw}
+
+def active_writes(unique_id, query, plan):
+    writes = [Write("raw_ebay_active", RAW_ACTIVE_COLUMNS, plan["raw_rows"])]
+    if plan["summary"]:
+        # A second scrape on the same day refreshes today's row
+        writes.append(Write(
+            "activedailypricelog", ACTIVE_DAILY_COLUMNS, [plan["summary"]], ("unique_id", "active_date")
+        ))
+    # Only reached with a parsed page (a failed fetch has no plan, see submit_side); a page with
+    # no listings is still a completed scrape
+    writes.append(state_write("active", unique_id, detail="empty" if plan["empty"] else None))
+    return writes
+
+# === Per card: aggregate without the DB, then hand both sides to the write-behind buffer ===
+def prepare_card(card, sold_result, active_result, watermark=None, stages=STAGES):
+    print(f"\n🃏 {card['unique_id']} | {card['query']} | Tier {card['tier']}")
+    return {
+        "card": card,
+        "stages": stages,
+        "sold": prepare_sold(card["unique_id"], card["query"], sold_result, watermark) if "sold" in stages else None,
+        "active": prepare_active(card["unique_id"], card["query"], active_result) if "active" in stages else None,
+    }
+
+async def side_outcome(side, unique_id, written, complete):
+    ok = await written
+    if not ok:
+        # The unit rolled back along with its state row; record the failure on its own
+        await write_buffer.submit([state_write(side, unique_id, ok=False, detail="write_error")], label=f"State {unique_id}")
+    return ok and complete
+
+async def submit_side(label, build_writes, unique_id, query, side_plan, run_id):
+    side = label.lower()
+    if side_plan is None:
+        print(f"❌ {label} fetch failed for {unique_id}")
+        await write_buffer.submit([state_write(side, unique_id, ok=False, detail="fetch_error")], label=f"State {unique_id}")
+        return resolved(False)
+    # A truncated sold history is stored, but the stage isn't done: a resume must fetch it again
+    complete = not side_plan.get("truncated", False)
+    writes = build_writes(unique_id, query, side_plan)
+    if run_id and complete:
+        # The checkpoint row lands in the same transaction as the data it vouches for
+        writes.append(Write("scrape_run_progress", PROGRESS_COLUMNS, [(run_id, unique_id, side)], PROGRESS_COLUMNS))
+    written = await write_buffer.submit(writes, label=f"{label} {unique_id}")
+    return asyncio.create_task(side_outcome(side, unique_id, written, complete))
+
+async def submit_card(plan, run_id=None):
+    """
+    Queues both sides of a card; returns (sold, active) futures resolving to True once a complete
+    fetch has committed. Each side is its own unit, so one failing doesn't discard the other.
+    A stage already checkpointed by an earlier attempt at this run counts as done.
+    """
+    card, stages = plan["card"], plan["stages"]
+    unique_id, query = card["unique_id"], card["query"]
+    sold = active = resolved(True)
+    if "sold" in stages:
+        sold = await submit_side("Sold", sold_writes, unique_id, query, plan["sold"], run_id)
+    if "active" in stages:
+        active = await submit_side("Active", active_writes, unique_id, query, plan["active"], run_id)
+    return sold, active
+
+async def card_outcome(card, futures, on_done=None):
+    sold_success, active_success = [await f for f in futures]
+    print(f"✅ Done: {card['unique_id']} | Sold: {'✔️' if sold_success else '❌'} | Active: {'✔️' if active_success else '❌'}")
+    if on_done:
+        on_done(card, (sold_success, active_success))
+    return sold_success, active_success
 
-        print(f"✅ Done: {unique_id} | Sold: {'✔️' if sold_success else '❌'} | Active: {'✔️' if active_success else '❌'}")
-        await asyncio.sleep(CARD_DELAY)
+# === Staged run: fetch (network + parse pool) → aggregate (CPU) → write (Postgres) ===
+async def run_cards_pipeline(cards, done=None, run_id=None, on_card_done=None):
+    """
+    Scrapes `cards` through the pipeline and returns [(card, (sold_ok, active_ok))] once
+    every write has been flushed. Cards whose group failed inside a stage are missing from the result.
+    `on_card_done(card, outcome)` is called as soon as a card's writes have committed (or failed).
+    """
+    done = done or {}
+    groups = group_cards_by_query(cards)
+    watermarks = await load_card_watermarks([c["unique_id"] for c in cards])
+    submitted = []
+
+    async def fetch_group(group):
+        query = " ".join(group[0]["query"].split())
+        if len(group) > 1:
+            print(f"\n🔗 '{query}' shared by {len(group)} cards: {', '.join(c['unique_id'] for c in group)}")
+
+        # Page back only as far as the least up-to-date card in the group needs
+        card_marks = [watermarks.get(c["unique_id"]) for c in group]
+        since = None if None in card_marks else min(w.last_sold_date for w in card_marks)
+
+        # Only fetch the sides some card in the group still needs
+        card_stages = [[s for s in STAGES if s not in done.get(c["unique_id"], ())] for c in group]
+        needed = {s for stages in card_stages for s in stages}
+
+        sold_result, active_result = await fetch_query(query, since=since, stages=needed)
+        return group, card_marks, card_stages, sold_result, active_result
+
+    async def aggregate_group(fetched):
+        group, card_marks, card_stages, sold_result, active_result = fetched
+        return [
+            prepare_card(c, sold_result, active_result, mark, stages)
+            for c, mark, stages in zip(group, card_marks, card_stages)
+        ]
+
+    async def write_group(plans):
+        # Queue only: the buffer commits in the background, so this stage never waits on Postgres
+        # unless the buffer is backed up
+        for plan in plans:
+            futures = await submit_card(plan, run_id)
+            submitted.append((plan["card"], asyncio.create_task(card_outcome(plan["card"], futures, on_card_done))))
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch_group, concurrency=MAX_CONCURRENCY),
+        Stage("aggregate", aggregate_group, concurrency=1),
+        Stage("write", write_group, concurrency=1),
+    ])
+    await pipeline.run(groups.values())
+    await write_buffer.flush()
+    return [(card, await outcome) for card, outcome in submitted]
 
 # === Run full batch from cards_due.json ===
-async def run_dual_scraper():
+async def run_dual_scraper(fresh=False, on_card_done=None):
     try:
         with open("cards_due.json", "r") as f:
             cards = json.load(f)
@@ -231,15 +327,115 @@ async def run_dual_scraper():
         print(f"❌ Failed to load cards_due.json: {e}")
         return
 
-    print(f"🔁 Starting run on {len(cards)} cards from file")
-    sem = asyncio.Semaphore(CONCURRENT_LIMIT)
-    tasks = [run_card_with_semaphore(c["unique_id"], c["query"], c["tier"], sem) for c in cards]
-    await asyncio.gather(*tasks)
+    run_id, done = await load_run_checkpoint(cards, fresh)
+    pending = [c for c in cards if not set(STAGES) <= done.get(c["unique_id"], set())]
+    if len(pending) < len(cards):
+        print(f"⏩ Resuming run {run_id}: {len(cards) - len(pending)} cards already finished, {len(pending)} left")
+
+    print(f"🔁 Starting run on {len(pending)} cards from file ({len(group_cards_by_query(pending))} distinct queries)")
+    try:
+        await run_cards_pipeline(pending, done, run_id, on_card_done)
+    finally:
+        await write_buffer.close()
+        await close_async_client()
+        shutdown_parse_pool()
+
+    if run_id:
+        async with async_session() as session:
+            if await finish_run_if_complete(session, run_id):
+                print(f"🏁 Run {run_id} complete")
+            else:
+                print(f"⚠️ Run {run_id} has unfinished cards; re-run to retry just those")
+    await db.dispose_async_engines()
+    print(f"📦 Response cache: {response_cache.stats()}")
     print("✅ scrape_ebay_dual.py finished")
 
-async def run_card_with_semaphore(uid, q, t, sem):
-    async with sem:
-        await scrape_card(uid, q, t)
+async def load_run_checkpoint(cards, fresh=False):
+    run_id = run_id_for_cards(cards)
+    try:
+        async with async_session() as session:
+            done = await start_run(session, run_id, run_card_count(cards), reset=fresh)
+        return run_id, done
+    except Exception as e:
+        print(f"⚠️ Could not load run checkpoint, progress won't be saved: {e}")
+        return None, {}
+
+async def load_card_watermarks(unique_ids):
+    try:
+        async with async_session() as session:
+            return await load_watermarks(session, unique_ids)
+    except Exception as e:
+        print(f"⚠️ Could not load watermarks, scraping full 90-day window: {e}")
+        return {}
+
+# === Queue worker mode: claim batches from scrape_jobs until the queue is empty ===
+async def keep_leases_alive(worker, job_ids):
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        try:
+            async with async_session() as session:
+                await heartbeat(session, worker, job_ids)
+        except Exception as e:
+            print(f"⚠️ Heartbeat failed for {worker}: {e}")
+
+async def run_job_batch(worker, jobs):
+    print(f"📥 {worker} claimed {len(jobs)} jobs ({len(group_cards_by_query(jobs))} distinct queries)")
+
+    lease_task = asyncio.create_task(keep_leases_alive(worker, [j["job_id"] for j in jobs]))
+    try:
+        outcomes = {job["job_id"]: outcome for job, outcome in await run_cards_pipeline(jobs)}
+    finally:
+        lease_task.cancel()
+
+    done_ids = []
+    async with async_session() as session:
+        for job in jobs:
+            outcome = outcomes.get(job["job_id"])
+            if outcome is None:
+                await fail_job(session, worker, job["job_id"], "pipeline stage error")
+            elif all(outcome):
+                done_ids.append(job["job_id"])
+            else:
+                failed = [side for side, ok in zip(STAGES, outcome) if not ok]
+                # Fetch failed, history truncated or write rolled back: the job goes back for a retry
+                await fail_job(session, worker, job["job_id"], f"{'/'.join(failed)} failed")
+        await complete_jobs(session, worker, done_ids)
+    print(f"📤 {worker}: {len(done_ids)}/{len(jobs)} jobs done")
+
+async def run_queue_worker(poll_seconds=None):
+    worker = worker_id()
+    print(f"👷 Worker {worker} started (batch {CLAIM_BATCH_SIZE}, lease {LEASE_SECONDS}s)")
+
+    try:
+        while True:
+            async with async_session() as session:
+                jobs = await claim_jobs(session, worker)
+            if not jobs:
+                if poll_seconds is None:
+                    break
+                await asyncio.sleep(poll_seconds)
+                continue
+            await run_job_batch(worker, jobs)
+    finally:
+        await write_buffer.close()
+        await close_async_client()
+        shutdown_parse_pool()
+
+    async with async_session() as session:
+        print(f"📊 scrape_jobs: {await queue_counts(session)}")
+    await db.dispose_async_engines()
+    print(f"📦 Response cache: {response_cache.stats()}")
+    print(f"✅ Worker {worker} finished: queue empty")
 
 if __name__ == "__main__":
-    asyncio.run(run_dual_scraper())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", action="store_true", help="Re-parse stored eBay pages from the response cache without touching the network")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the saved progress for this cards_due.json and scrape every card again")
+    parser.add_argument("--worker", action="store_true", help="Claim cards from the scrape_jobs queue instead of cards_due.json")
+    parser.add_argument("--poll", type=float, help="With --worker: keep polling every N seconds instead of exiting when the queue is empty")
+    args = parser.parse_args()
+    response_cache.set_replay(args.replay)
+    if args.worker:
+        asyncio.run(run_queue_worker(poll_seconds=args.poll))
+    else:
+        asyncio.run(run_dual_scraper(fresh=args.fresh))
@@ -1,49 +1,189 @@
 import requests
-from bs4 import BeautifulSoup
+import httpx
+import os
 import re
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 
 from utils import (
     is_valid_price,
-    is_valid_condition,
-    is_valid_title,
+    is_valid_titles,
     detect_holo_type,
     parse_card_meta
 )
+from rate_limiter import ebay_limiter, is_pushback
+from parser_backends import get_parser_backend
+import response_cache
+
+PAGE_SIZE = 120
+MAX_SOLD_PAGES = int(os.getenv("EBAY_MAX_SOLD_PAGES", "10"))
+SOLD_WINDOW_DAYS = 90
+
+# Point at a stand-in server (e.g. benchmarks/mock_ebay.py) for load tests
+EBAY_BASE_URL = os.getenv("EBAY_BASE_URL", "https://www.ebay.co.uk").rstrip("/")
+
+# Worker processes for HTML parsing + filtering; 0 parses inline on the event loop
+PARSE_WORKERS = int(os.getenv("EBAY_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# eBay sort orders: 1 = ending soonest, 13 = end date (recent first)
+SORT_ENDING_SOONEST = "1"
+SORT_RECENTLY_ENDED = "13"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
     "Accept-Language": "en-GB,en;q=0.9"
 }
 
+# === Shared async HTTP client (keep-alive + HTTP/2, one pool per process) ===
+_async_client = None
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=12,
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _async_client
+
+class EbayFetchError(Exception):
+    """Transport error, non-2xx or blocked page: not a (possibly empty) result list, so never parse it as one."""
+
+def is_blocked_page(html):
+    return "Expensive keywords" in html or "can't be greater than" in html
+
+def _cached_or_replay_miss(url, mode):
+    cached = response_cache.get(url, mode)
+    if cached is None and response_cache.is_replay():
+        raise Exception("📼 Replay mode: no stored page for this URL")
+    return cached
+
+def _store_if_usable(url, mode, status_code, html):
+    if status_code == 200 and not is_blocked_page(html):
+        response_cache.put(url, mode, html)
+
+def fetch_page(url, mode):
+    cached = _cached_or_replay_miss(url, mode)
+    if cached is not None:
+        return cached
+
+    resp = requests.get(url, headers=HEADERS, timeout=12)
+    _store_if_usable(url, mode, resp.status_code, resp.text)
+    return resp.text
+
+async def fetch_page_async(url, mode):
+    cached = _cached_or_replay_miss(url, mode)
+    if cached is not None:
+        return cached
+
+    async with ebay_limiter.slot(url) as host:
+        try:
+            resp = await get_async_client().get(url)
+        except httpx.TimeoutException as e:
+            host.record_pushback("timeout")
+            raise EbayFetchError(f"Timeout for {url}") from e
+        except httpx.HTTPError as e:
+            raise EbayFetchError(f"{type(e).__name__} for {url}: {e}") from e
+
+        reason = is_pushback(resp.status_code, resp.text)
+        if reason:
+            host.record_pushback(reason)
+        else:
+            host.record_success()
+
+    if not 200 <= resp.status_code < 300:
+        raise EbayFetchError(f"HTTP {resp.status_code} for {url}")
+    if reason == "blocked" or is_blocked_page(resp.text):
+        raise EbayFetchError(f"Blocked page for {url}")
+    _store_if_usable(url, mode, resp.status_code, resp.text)
+    return resp.text
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+# === Process-pool parse stage ===
+# Workers return compact records (tuples + indices into them) instead of dicts;
+# character/card_number are the same for every row of a query and are re-attached here.
+RECORD_FIELDS = ("title", "price", "sold_date", "url", "condition", "holo_type")
+
+_parse_pool = None
+
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None and PARSE_WORKERS > 0:
+        # Not plain fork: the pool starts lazily, possibly while other threads (the controller's
+        # TCG stage) hold locks a forked worker would inherit locked. forkserver forks workers
+        # from a clean single-threaded server process instead.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=context)
+    return _parse_pool
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=True, cancel_futures=True)
+        _parse_pool = None
+
+def parse_page_records(html, query, url, sold, max_items):
+    items = select_listing_items(html, sold=sold)
+    build = build_sold_results if sold else build_active_results
+    result = build(query, url, items, max_items)
+
+    index_of = {id(row): i for i, row in enumerate(result["raw"])}
+    records = [tuple(row.get(field) for field in RECORD_FIELDS) for row in result["raw"]]
+    filtered_idx = [index_of[id(row)] for row in result["filtered"]]
+    return len(items), records, filtered_idx
+
+async def parse_page(html, query, url, sold, max_items):
+    """Runs parse_page_records in the worker pool; returns (items_found, raw/filtered dict)."""
+    pool = get_parse_pool()
+    if pool is None:
+        found, records, filtered_idx = parse_page_records(html, query, url, sold, max_items)
+    else:
+        loop = asyncio.get_running_loop()
+        found, records, filtered_idx = await loop.run_in_executor(
+            pool, parse_page_records, html, query, url, sold, max_items
+        )
+
+    character, digits = parse_card_meta(query)
+    raw = []
+    for record in records:
+        row = {"character": character, "card_number": digits}
+        row.update(zip(RECORD_FIELDS, record))
+        if not sold:
+            del row["sold_date"]
+        raw.append(row)
+    return found, {
+        "url": url,
+        "raw": raw,
+        "filtered": [raw[i] for i in filtered_idx]
+    }
+
 def clean_price(text):
     try:
         return float(re.sub(r"[^\d.]", "", text))
     except:
         return None
 
-def extract_sold_date(item):
-    for span in item.find_all("span"):
-        text = span.get_text(strip=True).lower()
-        if text.startswith("sold"):
-            match = re.search(r"(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})", text)
-            if match:
-                try:
-                    return datetime.strptime(match.group(0), "%d %b %Y").date()
-                except ValueError:
-                    return None
-    return None
-
-def build_ebay_url(query, sold=False, max_items=120):
-    base_url = "https://www.ebay.co.uk/sch/183454/i.html"
+def build_ebay_url(query, sold=False, max_items=120, page=1, sort=SORT_ENDING_SOONEST):
+    base_url = f"{EBAY_BASE_URL}/sch/183454/i.html"
 
     params = {
         "_nkw": query,
         "_in_kw": "4",
-        "_sop": "1",
+        "_sop": sort,
         "_dmd": "2",
-        "_ipg": str(min(max_items, 120)),
+        "_ipg": str(min(max_items, PAGE_SIZE)),
         "rt": "nc",
         "LH_PrefLoc": "1",
         "Graded": "No",
@@ -56,52 +196,144 @@ def build_ebay_url(query, sold=False, max_items=120):
     else:
         params["LH_BIN"] = "1"
 
+    if page > 1:
+        params["_pgn"] = str(page)
+
     return f"{base_url}?{urlencode(params)}"
 
+def select_listing_items(html, sold=False):
+    if is_blocked_page(html):
+        raise Exception("⚠️ eBay blocked this query due to keyword limits or item cap.")
+    items = get_parser_backend().extract(html, sold=sold)
+    print(f"🔢 Found {len(items)} {'sold' if sold else 'active'} listings")
+    return items
+
 def parse_ebay_sold_page(query, max_items=120):
-    character, digits = parse_card_meta(query)
-    results_raw = []
-    results_filtered = []
     url = build_ebay_url(query, sold=True, max_items=max_items)
 
     print(f"\n🔎 SOLD QUERY: {query}")
     print(f"🔗 URL: {url}")
 
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=12)
-        if "Expensive keywords" in resp.text or "can't be greater than" in resp.text:
-            raise Exception("⚠️ eBay blocked this query due to keyword limits or item cap.")
-        soup = BeautifulSoup(resp.text, "html.parser")
-        items = soup.select(".s-item")
-        print(f"🔢 Found {len(items)} sold listings")
-
+        html = fetch_page(url, "sold")
+        items = select_listing_items(html, sold=True)
     except Exception as e:
         print("❌ Sold scrape error:", e)
         return {"url": url, "raw": [], "filtered": []}
 
-    ninety_days_ago = datetime.utcnow().date() - timedelta(days=90)
+    return build_sold_results(query, url, items, max_items)
+
+async def async_parse_ebay_sold_page(query, max_items=120):
+    url = build_ebay_url(query, sold=True, max_items=max_items)
+
+    print(f"\n🔎 SOLD QUERY: {query}")
+    print(f"🔗 URL: {url}")
+
+    try:
+        html = await fetch_page_async(url, "sold")
+        _, result = await parse_page(html, query, url, True, max_items)
+    except Exception as e:
+        # Callers log a failure; an empty result here would read as "no listings"
+        print("❌ Sold scrape error:", e)
+        raise
+
+    return result
+
+async def iter_ebay_sold_pages(query, since=None, max_pages=MAX_SOLD_PAGES):
+    """
+    Streams sold result pages newest-first and stops as soon as a listing is older
+    than the 90-day window or `since` (the card's last logged sale date).
+    Each yielded page is a build_sold_results dict trimmed to the cut-off. Any fetch or parse
+    error is raised, so a partial history is never mistaken for a complete one; if `max_pages`
+    runs out first, the last page is marked "truncated".
+    """
+    cutoff = datetime.utcnow().date() - timedelta(days=SOLD_WINDOW_DAYS)
+    if since and since > cutoff:
+        cutoff = since
+    seen_urls = set()
+
+    for page in range(1, max_pages + 1):
+        url = build_ebay_url(query, sold=True, page=page, sort=SORT_RECENTLY_ENDED)
+        print(f"\n🔎 SOLD QUERY: {query} | page {page}")
+        print(f"🔗 URL: {url}")
+
+        try:
+            html = await fetch_page_async(url, "sold")
+            items_found, result = await parse_page(html, query, url, True, PAGE_SIZE)
+        except Exception as e:
+            # Callers log a failure; an error page is not "no sales", and stopping here would
+            # pass the pages so far off as the whole history
+            print(f"❌ Sold scrape error on page {page}:", e)
+            raise
+
+        reached_cutoff = False
+        kept = []
+        for listing in result["raw"]:
+            if listing["sold_date"] < cutoff.isoformat():
+                reached_cutoff = True
+                continue
+            # Pages shift while we read them; don't count a listing twice
+            if listing["url"] in seen_urls:
+                continue
+            seen_urls.add(listing["url"])
+            kept.append(listing)
+
+        kept_ids = {id(listing) for listing in kept}
+        result["raw"] = kept
+        result["filtered"] = [listing for listing in result["filtered"] if id(listing) in kept_ids]
+
+        complete = reached_cutoff or items_found < PAGE_SIZE
+        result["truncated"] = not complete and page == max_pages
+        yield result
+
+        if complete:
+            return
+    print(f"⚠️ Stopped at page limit ({max_pages}) before reaching {cutoff} for {query}")
+
+async def async_parse_ebay_sold_history(query, since=None, max_pages=MAX_SOLD_PAGES):
+    urls, raw, filtered = [], [], []
+    truncated = False
+    async for page in iter_ebay_sold_pages(query, since=since, max_pages=max_pages):
+        urls.append(page["url"])
+        raw.extend(page["raw"])
+        filtered.extend(page["filtered"])
+        truncated = page["truncated"]
+
+    print(f"📚 Sold history: {len(urls)} page(s) | {len(raw)} raw | {len(filtered)} filtered")
+    return {
+        "url": urls[0] if urls else build_ebay_url(query, sold=True, sort=SORT_RECENTLY_ENDED),
+        "urls": urls,
+        "raw": raw,
+        "filtered": filtered,
+        # Older sales weren't read: don't treat this as the card's full history
+        "truncated": truncated
+    }
+
+def build_sold_results(query, url, items, max_items=120):
+    character, digits = parse_card_meta(query)
+    results_raw = []
+    passes_price_and_date = []
+
+    ninety_days_ago = datetime.utcnow().date() - timedelta(days=SOLD_WINDOW_DAYS)
 
     for item in items:
         if len(results_raw) >= max_items:
             break
 
-        title_tag = item.select_one(".s-item__title")
-        price_tag = item.select_one(".s-item__price")
-        link_tag = item.select_one(".s-item__link")
-        sold_date = extract_sold_date(item)
+        sold_date = item.sold_date
 
-        if not all([title_tag, price_tag, link_tag, sold_date]):
+        if item.title is None or item.price_text is None or not item.url or not sold_date:
             print("⚠️ Skipped - Missing:", {
-                "title": bool(title_tag),
-                "price": bool(price_tag),
-                "link": bool(link_tag),
+                "title": item.title is not None,
+                "price": item.price_text is not None,
+                "link": bool(item.url),
                 "sold_date": bool(sold_date)
             })
             continue
 
-        title = title_tag.text.strip()
-        url_item = link_tag['href']
-        price = clean_price(price_tag.text)
+        title = item.title
+        url_item = item.url
+        price = clean_price(item.price_text)
         holo_type = detect_holo_type(title)
         condition = "Unknown"
 
@@ -117,13 +349,14 @@ def parse_ebay_sold_page(query, max_items=120):
         }
 
         results_raw.append(result)
+        passes_price_and_date.append(is_valid_price(price) and sold_date >= ninety_days_ago)
 
-        if (
-            is_valid_price(price) and
-            is_valid_title(title, character, digits) and
-            sold_date >= ninety_days_ago
-        ):
-            results_filtered.append(result)
+    # Title rules run once over the whole page
+    valid_titles = is_valid_titles([r["title"] for r in results_raw], character, digits)
+    results_filtered = [
+        result for result, ok, title_ok in zip(results_raw, passes_price_and_date, valid_titles)
+        if ok and title_ok
+    ]
 
     print(f"✅ Sold listings parsed: {len(results_raw)} raw | {len(results_filtered)} filtered")
     return {
@@ -133,45 +366,56 @@ def parse_ebay_sold_page(query, max_items=120):
     }
 
 def parse_ebay_active_page(query, max_items=120):
-    character, digits = parse_card_meta(query)
-    results_raw = []
-    results_filtered = []
     url = build_ebay_url(query, sold=False, max_items=max_items)
 
     print(f"\n🔎 ACTIVE QUERY: {query}")
     print(f"🔗 URL: {url}")
 
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=12)
-        if "Expensive keywords" in resp.text or "can't be greater than" in resp.text:
-            raise Exception("⚠️ eBay blocked this query due to keyword limits or item cap.")
-        soup = BeautifulSoup(resp.text, "html.parser")
-        items = soup.select(".s-item")
-        print(f"🔢 Found {len(items)} active listings")
-
+        html = fetch_page(url, "active")
+        items = select_listing_items(html, sold=False)
     except Exception as e:
         print("❌ Active scrape error:", e)
         return {"url": url, "raw": [], "filtered": []}
 
+    return build_active_results(query, url, items, max_items)
+
+async def async_parse_ebay_active_page(query, max_items=120):
+    url = build_ebay_url(query, sold=False, max_items=max_items)
+
+    print(f"\n🔎 ACTIVE QUERY: {query}")
+    print(f"🔗 URL: {url}")
+
+    try:
+        html = await fetch_page_async(url, "active")
+        _, result = await parse_page(html, query, url, False, max_items)
+    except Exception as e:
+        # Callers log a failure; an empty result here would read as "no listings"
+        print("❌ Active scrape error:", e)
+        raise
+
+    return result
+
+def build_active_results(query, url, items, max_items=120):
+    character, digits = parse_card_meta(query)
+    results_raw = []
+    passes_price = []
+
     for item in items:
         if len(results_raw) >= max_items:
             break
 
-        title_tag = item.select_one(".s-item__title")
-        price_tag = item.select_one(".s-item__price")
-        link_tag = item.select_one(".s-item__link")
-
-        if not all([title_tag, price_tag, link_tag]):
+        if item.title is None or item.price_text is None or not item.url:
             print("⚠️ Skipped - Missing:", {
-                "title": bool(title_tag),
-                "price": bool(price_tag),
-                "link": bool(link_tag)
+                "title": item.title is not None,
+                "price": item.price_text is not None,
+                "link": bool(item.url)
             })
             continue
 
-        title = title_tag.text.strip()
-        url_item = link_tag['href']
-        price = clean_price(price_tag.text)
+        title = item.title
+        url_item = item.url
+        price = clean_price(item.price_text)
         holo_type = detect_holo_type(title)
         condition = "Unknown"
 
@@ -186,12 +430,13 @@ def parse_ebay_active_page(query, max_items=120):
         }
 
         results_raw.append(result)
+        passes_price.append(is_valid_price(price))
 
-        if (
-            is_valid_price(price) and
-            is_valid_title(title, character, digits)
-        ):
-            results_filtered.append(result)
+    valid_titles = is_valid_titles([r["title"] for r in results_raw], character, digits)
+    results_filtered = [
+        result for result, ok, title_ok in zip(results_raw, passes_price, valid_titles)
+        if ok and title_ok
+    ]
 
     print(f"✅ Active listings parsed: {len(results_raw)} raw | {len(results_filtered)} filtered")
     return {
@@ -0,0 +1,93 @@
+# bench_parsers.py
+# Parity check + timing for the eBay HTML parser backends over the saved fixtures.
+# Usage: python benchmarks/bench_parsers.py [--iterations 20] [--fixtures DIR]
+# Exits non-zero if any backend disagrees with the BeautifulSoup reference output.
+
+import os
+import sys
+import io
+import time
+import argparse
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parser_backends import BACKENDS, get_parser_backend
+from archive.scraper import build_sold_results, build_active_results
+from benchmarks.fixtures import FIXTURE_DIR, load_fixtures, fixture_kind, fixture_query
+
+REFERENCE_BACKEND = "bs4"
+
+def build_results(backend, name, html):
+    sold = fixture_kind(name) == "sold"
+    query = fixture_query(html)
+    with redirect_stdout(io.StringIO()):
+        listings = backend.extract(html, sold=sold)
+        build = build_sold_results if sold else build_active_results
+        return build(query, name, listings)
+
+def check_parity(fixtures, backends):
+    mismatches = []
+    reference = backends[REFERENCE_BACKEND]
+    for name, html in fixtures.items():
+        if fixture_kind(name) == "block":
+            continue
+        expected = build_results(reference, name, html)
+        for backend_name, backend in backends.items():
+            if backend_name == REFERENCE_BACKEND:
+                continue
+            actual = build_results(backend, name, html)
+            for key in ("raw", "filtered"):
+                if actual[key] != expected[key]:
+                    mismatches.append((name, backend_name, key, len(expected[key]), len(actual[key])))
+    return mismatches
+
+def time_backend(backend, fixtures, iterations):
+    pages = listings = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for name, html in fixtures.items():
+            if fixture_kind(name) == "block":
+                continue
+            result = build_results(backend, name, html)
+            pages += 1
+            listings += len(result["raw"])
+    elapsed = time.perf_counter() - start
+    return pages, listings, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = get_parser_backend(name)
+        except RuntimeError as e:
+            print(f"⚠️ Skipping backend {name}: {e}")
+
+    print(f"📂 {len(fixtures)} fixtures from {args.fixtures}")
+
+    mismatches = check_parity(fixtures, backends)
+    for name, backend_name, key, expected, actual in mismatches:
+        print(f"❌ Parity mismatch: {backend_name} on {name} [{key}] expected {expected} rows, got {actual}")
+    if not mismatches:
+        print(f"✅ Parity OK: {', '.join(backends)} produce identical raw/filtered results")
+
+    baseline = None
+    for backend_name, backend in backends.items():
+        pages, listings, elapsed = time_backend(backend, fixtures, args.iterations)
+        per_page_ms = elapsed / pages * 1000 if pages else 0
+        baseline = baseline or per_page_ms
+        speedup = baseline / per_page_ms if per_page_ms else 0
+        print(
+            f"⏱️ {backend_name:>5}: {pages / elapsed:8.1f} pages/s | {listings / elapsed:9.0f} listings/s | "
+            f"{per_page_ms:6.2f} ms/page | {speedup:4.1f}x vs {REFERENCE_BACKEND}"
+        )
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# bench_scraper.py
+# Offline end-to-end benchmark of the eBay scrape path over recorded result pages:
+# parse (block check + listing extraction) -> filter (build_*_results) -> aggregate (group by day + median).
+# Usage: python benchmarks/bench_scraper.py [--iterations 20] [--fixtures DIR] [--cache DIR] [--no-record] [--history 10]
+# Each run is appended to benchmarks/results/history.jsonl (gitignored) tagged with the current commit.
+
+import os
+import sys
+import io
+import json
+import time
+import resource
+import argparse
+import subprocess
+from datetime import datetime
+from contextlib import redirect_stdout
+
+import zstandard
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from parser_backends import get_parser_backend
+from archive.scraper import select_listing_items, build_sold_results, build_active_results
+from utils import filter_outliers, calculate_median, summarize_daily_prices
+from benchmarks.fixtures import FIXTURE_DIR, load_fixtures, fixture_kind, fixture_query
+
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "results", "history.jsonl")
+STAGES = ("parse", "filter", "aggregate")
+
+# === Corpus ===
+def load_cache_corpus(cache_dir):
+    # Pages stored by response_cache: <cache_dir>/<mode>/<xx>/<key>.html.zst
+    corpus = {}
+    decompressor = zstandard.ZstdDecompressor()
+    for mode in ("sold", "active"):
+        mode_dir = os.path.join(cache_dir, mode)
+        for dirpath, _, filenames in os.walk(mode_dir):
+            for name in sorted(filenames):
+                if not name.endswith(".html.zst"):
+                    continue
+                with open(os.path.join(dirpath, name), "rb") as f:
+                    html = decompressor.decompress(f.read()).decode("utf-8")
+                corpus[f"{mode}_{name[:12]}.html"] = html
+    return corpus
+
+def build_corpus(args):
+    corpus = {}
+    if args.fixtures:
+        corpus.update(load_fixtures(args.fixtures))
+    if args.cache:
+        corpus.update(load_cache_corpus(args.cache))
+    return [(name, fixture_kind(name), fixture_query(html), html) for name, html in corpus.items()]
+
+# === One page through the whole path ===
+def run_page(kind, query, name, html, timings, counts):
+    sold = kind == "sold"
+
+    start = time.perf_counter()
+    try:
+        items = select_listing_items(html, sold=sold)
+    except Exception:
+        timings["parse"] += time.perf_counter() - start
+        counts["blocked"] += 1
+        return
+    parsed = time.perf_counter()
+
+    build = build_sold_results if sold else build_active_results
+    result = build(query, name, items)
+    filtered = time.perf_counter()
+
+    if sold:
+        summarize_daily_prices(result["filtered"])
+    else:
+        prices = filter_outliers([item["price"] for item in result["raw"] if item.get("price")])
+        calculate_median(prices)
+    done = time.perf_counter()
+
+    timings["parse"] += parsed - start
+    timings["filter"] += filtered - parsed
+    timings["aggregate"] += done - filtered
+    counts["pages"] += 1
+    counts["listings"] += len(result["raw"])
+    counts["kept"] += len(result["filtered"])
+
+def run_benchmark(corpus, iterations):
+    timings = dict.fromkeys(STAGES, 0.0)
+    counts = {"pages": 0, "blocked": 0, "listings": 0, "kept": 0}
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            for name, kind, query, html in corpus:
+                run_page(kind, query, name, html, timings, counts)
+    elapsed = time.perf_counter() - start
+    return elapsed, timings, counts
+
+# === History ===
+def current_commit():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--", "*.py"], cwd=ROOT) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}+dirty" if dirty else sha
+
+def record(entry):
+    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+    with open(HISTORY_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+def print_history(limit):
+    if not os.path.exists(HISTORY_PATH):
+        return
+    with open(HISTORY_PATH) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    print(f"\n📈 Last {min(limit, len(entries))} runs ({HISTORY_PATH}):")
+    for e in entries[-limit:]:
+        print(
+            f"  {e['recorded_at'][:16]}  {e['commit']:<14} {e['backend']:>5} "
+            f"{e['pages_per_sec']:8.1f} pages/s | {e['listings_per_sec']:9.0f} listings/s | "
+            f"peak {e['peak_rss_mb']:6.1f} MB"
+        )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of saved .html result pages")
+    parser.add_argument("--cache", help="also replay pages stored by response_cache (e.g. .ebay_cache)")
+    parser.add_argument("--no-record", action="store_true", help="don't append this run to the history file")
+    parser.add_argument("--history", type=int, default=10, help="previous runs to show")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args)
+    if not corpus:
+        print("❌ No pages to replay")
+        sys.exit(1)
+    backend = get_parser_backend().name
+
+    print(f"📂 {len(corpus)} pages | backend {backend} | {args.iterations} iterations")
+    elapsed, timings, counts = run_benchmark(corpus, args.iterations)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    total_pages = counts["pages"] + counts["blocked"]
+    print(
+        f"⏱️ {total_pages / elapsed:8.1f} pages/s | {counts['listings'] / elapsed:9.0f} listings/s | "
+        f"peak RSS {peak_rss_mb:.1f} MB | {counts['blocked']} block pages detected"
+    )
+    stage_total = sum(timings.values()) or 1
+    for stage in STAGES:
+        per_page_ms = timings[stage] / total_pages * 1000
+        print(f"   {stage:<10} {timings[stage]:7.3f}s  {per_page_ms:6.3f} ms/page  {timings[stage] / stage_total:6.1%}")
+
+    if not args.no_record:
+        record({
+            "recorded_at": datetime.utcnow().isoformat(),
+            "commit": current_commit(),
+            "backend": backend,
+            "corpus_pages": len(corpus),
+            "iterations": args.iterations,
+            "pages_per_sec": round(total_pages / elapsed, 2),
+            "listings_per_sec": round(counts["listings"] / elapsed, 1),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "stage_seconds": {stage: round(timings[stage], 4) for stage in STAGES},
+            "counts": counts,
+        })
+    print_history(args.history)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_title_matcher.py
+# Titles/sec for the keyword title filters: per-keyword loops (before) vs KeywordMatcher (after).
+# Usage: python benchmarks/bench_title_matcher.py [--titles 50000]
+# Exits non-zero if the compiled matcher disagrees with the loop it replaces.
+
+import os
+import sys
+import re
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from title_matcher import KeywordMatcher
+from utils import EXCLUDED_TERMS, BULK_QUANTITY_PATTERN, is_valid_title, is_valid_titles, parse_card_meta
+from parser_backends import get_parser_backend
+from benchmarks.fixtures import load_fixtures, fixture_kind
+
+QUERY = "Charizard GX Hidden Fates 9/68"
+
+# === The implementations KeywordMatcher replaced ===
+def loop_substring(titles):
+    return [any(kw in lowered for kw in EXCLUDED_TERMS) for lowered in (t.lower() for t in titles)]
+
+def loop_word_boundary(titles):
+    return [
+        any(re.search(rf"\b{re.escape(kw)}\b", lowered) for kw in EXCLUDED_TERMS)
+        for lowered in (t.lower() for t in titles)
+    ]
+
+def loop_is_valid_title(title, character, digits):
+    lowered = title.lower()
+    if any(term in lowered for term in EXCLUDED_TERMS):
+        return False
+    if character and character not in lowered:
+        return False
+    if digits:
+        numeric = "".join(filter(str.isdigit, lowered))
+        if digits not in numeric:
+            return False
+    if re.search(BULK_QUANTITY_PATTERN.pattern, lowered):
+        return False
+    if "&" in lowered or "+" in lowered:
+        return False
+    return True
+
+def build_corpus(size):
+    fixture_titles = []
+    for name, html in load_fixtures().items():
+        if fixture_kind(name) != "block":
+            fixture_titles.extend(l.title for l in get_parser_backend().extract(html) if l.title)
+
+    rng = random.Random(7)
+    extras = ["PSA 10", "joblot", "Japanese", "2x", "bundle", "played", "NM", "Holo", "&", "promo", ""]
+    corpus = []
+    while len(corpus) < size:
+        title = rng.choice(fixture_titles)
+        corpus.append(f"{title} {rng.choice(extras)}".strip())
+    return corpus
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    return label, time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=50000)
+    args = parser.parse_args()
+
+    titles = build_corpus(args.titles)
+    character, digits = parse_card_meta(QUERY)
+    substring = KeywordMatcher(EXCLUDED_TERMS)
+    word_boundary = KeywordMatcher(EXCLUDED_TERMS, word_boundary=True)
+
+    cases = [
+        ("substring keywords", lambda: loop_substring(titles), lambda: substring.classify(titles)),
+        ("word-boundary keywords", lambda: loop_word_boundary(titles), lambda: word_boundary.classify(titles)),
+        ("is_valid_title", lambda: [loop_is_valid_title(t, character, digits) for t in titles],
+            lambda: [is_valid_title(t, character, digits) for t in titles]),
+        ("is_valid_titles (batch)", lambda: [loop_is_valid_title(t, character, digits) for t in titles],
+            lambda: is_valid_titles(titles, character, digits)),
+    ]
+
+    print(f"🧪 {len(titles)} titles, {len(EXCLUDED_TERMS)} keywords")
+    mismatched = False
+    for name, before, after in cases:
+        _, before_s, before_result = timed("before", before)
+        _, after_s, after_result = timed("after", after)
+        same = before_result == after_result
+        mismatched = mismatched or not same
+        print(
+            f"{'✅' if same else '❌'} {name:<24} before {len(titles) / before_s:>10,.0f} titles/s | "
+            f"after {len(titles) / after_s:>10,.0f} titles/s | {before_s / after_s:5.1f}x"
+        )
+
+    sys.exit(1 if mismatched else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# fixtures.py
+# Generates eBay-style search result pages (.s-item markup) for offline parser benchmarks.
+# Run directly to (re)write the saved fixture set in benchmarks/fixtures/.
+
+import os
+import random
+import zlib
+from datetime import date, timedelta
+from html import escape, unescape
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Anchor date for the saved fixtures so the files don't change between regenerations
+FIXTURE_TODAY = date(2026, 10, 1)
+
+TITLE_SUFFIXES = [
+    "Pokemon Card", "Pokemon TCG NM", "Near Mint", "Holo Rare", "Reverse Holo",
+    "Ultra Rare", "Full Art", "Pack Fresh", "LP", "Mint Condition"
+]
+TITLE_NOISE = [
+    "PSA 10", "CGC 9", "Japanese", "x2", "Lot", "Bundle", "1st Edition", "Damaged", "& Energy", ""
+]
+
+SHOP_ON_EBAY = """
+<li class="s-item s-item__pl-on-bottom" data-viewport="">
+  <div class="s-item__wrapper clearfix">
+    <div class="s-item__info clearfix">
+      <a class="s-item__link" href="https://ebay.com/itm/123456"><div class="s-item__title"><span role="heading" aria-level="3">Shop on eBay</span></div></a>
+      <div class="s-item__details clearfix">
+        <div class="s-item__detail s-item__detail--primary"><span class="s-item__price">£20.00</span></div>
+      </div>
+    </div>
+  </div>
+</li>"""
+
+def render_listing(item_id, title, price_text, sold_date=None):
+    caption = ""
+    if sold_date:
+        caption = (
+            '<div class="s-item__caption-section"><div class="s-item__caption--row">'
+            '<span class="s-item__caption--signal POSITIVE">'
+            f'<span>Sold  {sold_date.day} {sold_date.strftime("%b %Y")}</span>'
+            '</span></div></div>'
+        )
+    return f"""
+<li class="s-item s-item__pl-on-bottom" data-viewport="" id="item{item_id:x}">
+  <div class="s-item__wrapper clearfix">
+    <div class="s-item__image-section"><div class="s-item__image"><img alt="{escape(title)}" src="https://i.ebayimg.com/thumbs/images/g/{item_id}/s-l140.webp" loading="eager"></div></div>
+    <div class="s-item__info clearfix">
+      {caption}
+      <a class="s-item__link" href="https://www.ebay.co.uk/itm/{item_id}?hash=item{item_id:x}:g:AAA&amp;amdata=enc%3A1"><div class="s-item__title"><span role="heading" aria-level="3"><span class="LIGHT_HIGHLIGHT">New listing</span>{escape(title)}</span></div></a>
+      <div class="s-item__subtitle"><span class="SECONDARY_INFO">Pre-owned</span></div>
+      <div class="s-item__details clearfix">
+        <div class="s-item__detail s-item__detail--primary"><span class="s-item__price"><span class="POSITIVE">{escape(price_text)}</span></span></div>
+        <div class="s-item__detail s-item__detail--primary"><span class="s-item__shipping s-item__logisticsCost">+£1.35 postage</span></div>
+        <div class="s-item__detail s-item__detail--primary"><span class="s-item__location s-item__itemLocation">from United Kingdom</span></div>
+        <span class="s-item__detail s-item__detail--secondary"><span class="s-item__hotness s-item__itemHotness"><span class="BOLD">{item_id % 9} watchers</span></span></span>
+      </div>
+    </div>
+  </div>
+</li>"""
+
+def render_results_page(query, count, sold=True, page=1, today=None, seed=0, sales_per_day=3, base_price=None, page_size=None):
+    """
+    Builds one results page. Sold pages are ordered newest-first, `sales_per_day`
+    listings per day, continuing from where page `page - 1` would have stopped.
+    `page_size` is the full page length when `count` is a short last page.
+    """
+    rng = random.Random(f"{query}|{sold}|{page}|{seed}")
+    today = today or date.today()
+    base_price = base_price or round(2 + (sum(map(ord, query)) % 60), 2)
+    first_index = (page - 1) * (page_size or count)
+
+    items = [SHOP_ON_EBAY] if page == 1 else []
+    for i in range(count):
+        index = first_index + i
+        item_id = 200000000000 + zlib.crc32(f"{query}|{sold}".encode()) + index
+        noise = rng.choice(TITLE_NOISE) if rng.random() < 0.2 else ""
+        title = " ".join(p for p in [query, rng.choice(TITLE_SUFFIXES), noise] if p)
+        price = max(0.2, rng.gauss(base_price, base_price * 0.2))
+        price_text = f"£{price:.2f}"
+        if not sold and rng.random() < 0.05:
+            price_text = f"£{price:.2f} to £{price * 2:.2f}"
+        sold_date = today - timedelta(days=index // max(sales_per_day, 1)) if sold else None
+        items.append(render_listing(item_id, title, price_text, sold_date))
+
+    results = "\n".join(items)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{escape(query)} | eBay</title></head>
+<body>
+<div id="srp-river-main"><div id="srp-river-results" class="srp-river-results clearfix">
+<ul class="srp-results srp-list clearfix">
+{results}
+</ul>
+</div></div>
+</body>
+</html>"""
+
+def render_block_page():
+    return """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>eBay</title></head>
+<body><div class="srp-main"><h3 class="srp-save-null-search__heading">Expensive keywords</h3>
+<p>Your search contains too many keywords. Please refine your search.</p></div></body></html>"""
+
+DEFAULT_FIXTURES = {
+    "sold_charizard_120.html": lambda: render_results_page("Charizard GX Hidden Fates 9/68", 120, sold=True, today=FIXTURE_TODAY, sales_per_day=6),
+    "sold_articuno_40.html": lambda: render_results_page("Articuno GX Celestial Storm 154", 40, sold=True, today=FIXTURE_TODAY, sales_per_day=1),
+    "sold_empty.html": lambda: render_results_page("Missingno 0/0", 0, sold=True, today=FIXTURE_TODAY),
+    "active_charizard_120.html": lambda: render_results_page("Charizard GX Hidden Fates 9/68", 120, sold=False, today=FIXTURE_TODAY),
+    "active_vaporeon_60.html": lambda: render_results_page("Vaporeon EX Generations 24", 60, sold=False, today=FIXTURE_TODAY),
+    "block_expensive_keywords.html": render_block_page,
+}
+
+def load_fixtures(directory=FIXTURE_DIR):
+    fixtures = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+def fixture_kind(name):
+    if name.startswith("block"):
+        return "block"
+    return "sold" if name.startswith("sold") else "active"
+
+def fixture_query(html):
+    # Pages carry their query in <title>; fall back to a generic card for recorded pages
+    start = html.find("<title>")
+    end = html.find(" | eBay</title>")
+    if start == -1 or end == -1:
+        return "Charizard GX Hidden Fates 9/68"
+    return unescape(html[start + len("<title>"):end])
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, render in DEFAULT_FIXTURES.items():
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(render())
+        print(f"📝 Wrote {name}")
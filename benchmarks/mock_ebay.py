@@ -0,0 +1,117 @@
+# mock_ebay.py
+# Local stand-in for the eBay search endpoints, for load-testing the scrapers without touching eBay.
+# Serves /sch/i.html and /sch/183454/i.html with generated .s-item markup (see fixtures.py).
+#
+# Usage:
+#   python benchmarks/mock_ebay.py --port 8089 --latency-ms 150 --jitter-ms 100 --error-rate 0.01 --block-rate 0.005
+#   EBAY_BASE_URL=http://127.0.0.1:8089 EBAY_CACHE_DIR=/tmp/mock_cache python ebay_sold_scraper.py
+# Point EBAY_CACHE_DIR somewhere disposable (or set EBAY_CACHE_TTL_SOLD/ACTIVE=0) so the
+# response cache doesn't mix mock pages with real ones.
+# GET /stats returns request counts; GET /stats?reset=1 also zeroes them.
+
+import os
+import sys
+import zlib
+import random
+import asyncio
+import argparse
+from collections import Counter
+from datetime import date
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.fixtures import render_results_page, render_block_page
+
+# === Config (overridden by CLI flags) ===
+config = {
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "throttle_rate": 0.0,
+    "block_rate": 0.0,
+    "max_results": 600,
+    "seed": 0,
+}
+stats = Counter()
+rng = random.Random()
+
+app = FastAPI(title="mock eBay search")
+
+def total_results(query, sold):
+    # Stable per query so repeated runs paginate the same way; some queries come back empty
+    spread = zlib.crc32(f"{query}|{sold}|{config['seed']}".encode()) % (config["max_results"] + 1)
+    return 0 if spread < config["max_results"] // 20 else spread
+
+def sales_per_day(query):
+    return 1 + zlib.crc32(query.encode()) % 8
+
+async def search(request: Request):
+    stats["requests"] += 1
+    params = request.query_params
+    query = params.get("_nkw", "")
+    sold = params.get("LH_Sold") == "1"
+    page = max(int(params.get("_pgn", "1") or 1), 1)
+    per_page = max(int(params.get("_ipg", "60") or 60), 1)
+
+    delay = config["latency_ms"] + rng.uniform(0, config["jitter_ms"])
+    if delay:
+        await asyncio.sleep(delay / 1000)
+
+    roll = rng.random()
+    if roll < config["error_rate"]:
+        stats["errors"] += 1
+        return PlainTextResponse("Service Unavailable", status_code=503)
+    roll -= config["error_rate"]
+    if roll < config["throttle_rate"]:
+        stats["throttled"] += 1
+        return PlainTextResponse("Too Many Requests", status_code=429)
+    roll -= config["throttle_rate"]
+    if roll < config["block_rate"]:
+        stats["blocked"] += 1
+        return HTMLResponse(render_block_page())
+
+    remaining = total_results(query, sold) - (page - 1) * per_page
+    count = max(0, min(per_page, remaining))
+    stats["sold_pages" if sold else "active_pages"] += 1
+    stats["listings"] += count
+    html = render_results_page(
+        query, count, sold=sold, page=page, today=date.today(), seed=config["seed"],
+        sales_per_day=sales_per_day(query), page_size=per_page
+    )
+    return HTMLResponse(html)
+
+app.add_api_route("/sch/i.html", search, methods=["GET"])
+app.add_api_route("/sch/183454/i.html", search, methods=["GET"])
+
+@app.get("/stats")
+async def get_stats(reset: bool = False):
+    snapshot = dict(stats)
+    if reset:
+        stats.clear()
+    return snapshot
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"], help="base delay per response")
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"], help="extra uniform random delay")
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"], help="fraction of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=config["throttle_rate"], help="fraction of 429 responses")
+    parser.add_argument("--block-rate", type=float, default=config["block_rate"], help='fraction of "Expensive keywords" pages')
+    parser.add_argument("--max-results", type=int, default=config["max_results"], help="upper bound on results per query")
+    parser.add_argument("--seed", type=int, default=config["seed"])
+    args = parser.parse_args()
+
+    for key in config:
+        config[key] = getattr(args, key)
+    rng.seed(args.seed)
+
+    print(f"🧪 Mock eBay on http://{args.host}:{args.port} | {config}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
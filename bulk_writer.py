@@ -0,0 +1,68 @@
+# bulk_writer.py
+# One-round-trip writes inside the session's current transaction.
+# bulk_insert: per-listing raw tables (raw_ebay_sold_debug, raw_ebay_active). On asyncpg
+# connections rows go through COPY (copy_records_to_table); other drivers get chunked
+# multi-row INSERT ... VALUES.
+# upsert_rows: the daily aggregate tables, as multi-row INSERT ... ON CONFLICT DO UPDATE.
+
+from sqlalchemy import text
+
+# Keeps a VALUES statement well under Postgres' 65535 bind-parameter limit
+VALUES_CHUNK_ROWS = 500
+
+async def _asyncpg_connection(session):
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver = getattr(raw, "driver_connection", None)
+    if not hasattr(driver, "copy_records_to_table"):
+        return None
+    # SQLAlchemy's asyncpg adapter only opens its transaction on the first statement it runs
+    # itself; a COPY sent straight to the driver before that would autocommit on its own
+    await session.execute(text("SELECT 1"))
+    return driver
+
+def _values_statement(table, columns, chunk, suffix=""):
+    params = {}
+    rows_sql = []
+    for i, row in enumerate(chunk):
+        names = []
+        for j, value in enumerate(row):
+            params[f"p{i}_{j}"] = value
+            names.append(f":p{i}_{j}")
+        rows_sql.append(f"({', '.join(names)})")
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join(rows_sql)}{suffix}"
+    return text(sql), params
+
+async def bulk_insert(session, table, columns, rows):
+    """Inserts `rows` (tuples in `columns` order) into `table`. Returns the number of rows sent."""
+    if not rows:
+        return 0
+    driver = await _asyncpg_connection(session)
+    if driver is not None:
+        await driver.copy_records_to_table(table, records=rows, columns=list(columns))
+        return len(rows)
+
+    for start in range(0, len(rows), VALUES_CHUNK_ROWS):
+        statement, params = _values_statement(table, columns, rows[start:start + VALUES_CHUNK_ROWS])
+        await session.execute(statement, params)
+    return len(rows)
+
+async def upsert_rows(session, table, columns, rows, conflict_columns):
+    """
+    Inserts `rows`, updating the non-key columns of rows whose `conflict_columns` already exist.
+    Needs a unique index on `conflict_columns`. Later duplicates of a key within `rows` win.
+    """
+    key_idx = [columns.index(c) for c in conflict_columns]
+    # One statement can't touch the same key twice
+    unique_rows = list({tuple(row[i] for i in key_idx): row for row in rows}.values())
+    if not unique_rows:
+        return 0
+
+    update_columns = [c for c in columns if c not in conflict_columns]
+    action = "UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns) if update_columns else "NOTHING"
+    suffix = f" ON CONFLICT ({', '.join(conflict_columns)}) DO {action}"
+
+    for start in range(0, len(unique_rows), VALUES_CHUNK_ROWS):
+        statement, params = _values_statement(table, columns, unique_rows[start:start + VALUES_CHUNK_ROWS], suffix)
+        await session.execute(statement, params)
+    return len(unique_rows)
@@ -0,0 +1,103 @@
+# checkpoint.py
+# Durable progress for long cards_due.json runs, so a crash or redeploy resumes instead of restarting.
+# A run is identified by a hash of its card list; each finished (card, stage) pair is one
+# scrape_run_progress row. A restart with the same card list skips stages that already finished.
+# A run that still isn't complete after RUN_MAX_ATTEMPTS attempts or RUN_EXPIRY_HOURS is given
+# up on, so one card that always fails can't pin cards_due.json (and bypass the scheduler) forever.
+# Tables: migrations/0003_scrape_run_checkpoints.sql, 0009_scrape_run_attempts.sql
+
+import os
+import json
+import hashlib
+from sqlalchemy import text
+
+STAGES = ("sold", "active")
+PROGRESS_COLUMNS = ("run_id", "unique_id", "stage")
+RUN_MAX_ATTEMPTS = int(os.getenv("SCRAPE_RUN_MAX_ATTEMPTS", "3"))
+RUN_EXPIRY_HOURS = int(os.getenv("SCRAPE_RUN_EXPIRY_HOURS", "48"))
+
+# Unfinished, but out of attempts or too old to keep resuming
+GIVEN_UP_SQL = "(attempts >= :max_attempts OR started_at < NOW() - make_interval(hours => :expiry_hours))"
+
+def run_id_for_cards(cards):
+    # Same card list -> same run, whatever order the controller wrote it in
+    entries = sorted(f"{c['unique_id']}|{' '.join((c.get('query') or '').split())}" for c in cards)
+    return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()[:16]
+
+def run_card_count(cards):
+    # Cards without a query are never fetched (group_cards_by_query drops them), so never finish
+    return len({c["unique_id"] for c in cards if c.get("query")})
+
+async def start_run(session, run_id, total_cards, reset=False):
+    """
+    Registers the run and returns {unique_id: set(finished stages)}.
+    A run that already finished (or reset=True) starts clean, so the same card list
+    due again later is scraped in full.
+    """
+    result = await session.execute(text("""
+        SELECT finished_at FROM scrape_runs WHERE run_id = :run_id
+    """), {"run_id": run_id})
+    row = result.first()
+    if row is not None and (reset or row[0] is not None):
+        await session.execute(text("DELETE FROM scrape_run_progress WHERE run_id = :run_id"), {"run_id": run_id})
+        await session.execute(text("""
+            UPDATE scrape_runs SET started_at = NOW(), finished_at = NULL, total_cards = :total, attempts = 1
+            WHERE run_id = :run_id
+        """), {"run_id": run_id, "total": total_cards})
+    elif row is None:
+        await session.execute(text("""
+            INSERT INTO scrape_runs (run_id, total_cards) VALUES (:run_id, :total)
+        """), {"run_id": run_id, "total": total_cards})
+    else:
+        # Resuming an unfinished run
+        await session.execute(text("""
+            UPDATE scrape_runs SET attempts = attempts + 1 WHERE run_id = :run_id
+        """), {"run_id": run_id})
+
+    result = await session.execute(text("""
+        SELECT unique_id, stage FROM scrape_run_progress WHERE run_id = :run_id
+    """), {"run_id": run_id})
+    done = {}
+    for uid, stage in result.fetchall():
+        done.setdefault(uid, set()).add(stage)
+    await session.commit()
+    return done
+
+async def finish_run_if_complete(session, run_id):
+    """
+    Closes the run if every card finished every stage, or if it is out of attempts/time
+    (the cards still missing are left to the scheduler). Returns True only for a complete run.
+    """
+    result = await session.execute(text(f"""
+        UPDATE scrape_runs r
+        SET finished_at = NOW()
+        WHERE r.run_id = :run_id AND r.finished_at IS NULL
+          AND (
+              (SELECT COUNT(*) FROM scrape_run_progress p WHERE p.run_id = r.run_id) >= r.total_cards * :stages
+              OR {GIVEN_UP_SQL}
+          )
+        RETURNING (SELECT COUNT(*) FROM scrape_run_progress p WHERE p.run_id = r.run_id) >= r.total_cards * :stages
+    """), {
+        "run_id": run_id, "stages": len(STAGES),
+        "max_attempts": RUN_MAX_ATTEMPTS, "expiry_hours": RUN_EXPIRY_HOURS,
+    })
+    row = result.first()
+    await session.commit()
+    if row is not None and not row[0]:
+        print(f"🪦 Giving up on run {run_id} after {RUN_MAX_ATTEMPTS} attempts or {RUN_EXPIRY_HOURS}h; unfinished cards go back to the scheduler")
+    return bool(row and row[0])
+
+def run_in_progress(cur, run_id):
+    """Sync check (psycopg2 cursor): True if this run started, hasn't finished every card yet and is still worth resuming."""
+    cur.execute("SELECT to_regclass('scrape_runs') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return False
+    # A run out of attempts or past its expiry no longer counts, even if nothing closed it
+    cur.execute("""
+        SELECT finished_at IS NULL
+           AND attempts < %s
+           AND started_at >= NOW() - make_interval(hours => %s)
+        FROM scrape_runs WHERE run_id = %s
+    """, (RUN_MAX_ATTEMPTS, RUN_EXPIRY_HOURS, run_id))
+    row = cur.fetchone()
+    return bool(row and row[0])
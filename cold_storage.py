@@ -0,0 +1,258 @@
+# cold_storage.py
+# Cold storage for raw listings. Months of raw_ebay_sold_debug / raw_ebay_active are exported to
+# zstd-compressed Parquet under COLD_STORAGE_DIR/<table>/month=YYYY-MM/, streamed through a
+# server-side cursor so memory stays at one chunk however big the month is. The files can be
+# queried offline (DuckDB if installed, otherwise pyarrow datasets), so audits and filter-rule
+# replays run off a laptop instead of the production database.
+# Usage:
+#   python cold_storage.py export [--table T] [--month YYYY-MM | --before YYYY-MM-DD]
+#   python cold_storage.py query "SELECT reason_excluded, COUNT(*) FROM raw_ebay_sold_debug GROUP BY 1"
+#   python cold_storage.py replay [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+
+import os
+import argparse
+from collections import Counter, defaultdict
+from datetime import date
+import db
+from partitions import add_months, month_start, is_partitioned, list_partitions
+from utils import is_valid_price, is_valid_titles, parse_card_meta
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# === Config ===
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "cold_storage")
+EXPORT_CHUNK_ROWS = int(os.getenv("COLD_EXPORT_CHUNK_ROWS", "50000"))
+COMPRESSION = "zstd"
+REPLAY_SAMPLE_TITLES = 5
+
+# table -> (date column, [(column, arrow type name)])
+TABLES = {
+    "raw_ebay_sold_debug": ("sold_date", [
+        ("unique_id", "string"), ("query_used", "string"), ("title", "string"), ("price", "float64"),
+        ("sold_date", "date32"), ("url", "string"), ("condition", "string"), ("holo_type", "string"),
+        ("included", "bool_"), ("reason_excluded", "string"),
+    ]),
+    "raw_ebay_active": ("date", [
+        ("unique_id", "string"), ("query", "string"), ("title", "string"), ("price", "float64"),
+        ("quantity", "int32"), ("date", "date32"), ("url", "string"), ("condition", "string"),
+        ("holo_type", "string"),
+    ]),
+}
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("❌ Cold storage needs pyarrow (pip install pyarrow)")
+
+def table_schema(table):
+    require_pyarrow()
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in TABLES[table][1]])
+
+def month_dir(table, month, root=COLD_STORAGE_DIR):
+    return os.path.join(root, table, f"month={month:%Y-%m}")
+
+def exported_months(table, root=COLD_STORAGE_DIR):
+    base = os.path.join(root, table)
+    if not os.path.isdir(base):
+        return set()
+    return {name.split("=", 1)[1] for name in os.listdir(base) if name.startswith("month=")}
+
+# === Export (Postgres -> Parquet) ===
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_floating(field.type):
+            # NUMERIC comes back as Decimal
+            values = [None if v is None else float(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_month(conn, table, month, root=COLD_STORAGE_DIR, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Writes `table`'s rows for the month starting `month` to one Parquet file, `chunk_rows`
+    per row group. Re-exporting a month replaces its file (or removes it if the month is now
+    empty). Returns the number of rows written.
+    """
+    date_column, columns = TABLES[table]
+    schema = table_schema(table)
+    target_dir = month_dir(table, month, root)
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, "part-0.parquet")
+    # Dot-prefixed: dataset readers skip it while it is being written
+    tmp_path = os.path.join(target_dir, ".part-0.parquet.tmp")
+
+    written = 0
+    writer = None
+    try:
+        with db.server_cursor(conn, f"cold_export_{table}", itersize=chunk_rows) as cur:
+            # Sorted by card so row-group statistics let readers skip most of a file per card
+            cur.execute(f"""
+                SELECT {', '.join(name for name, _ in columns)} FROM {table}
+                WHERE {date_column} >= %s AND {date_column} < %s
+                ORDER BY unique_id, {date_column}
+            """, (month, add_months(month, 1)))
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, schema, compression=COMPRESSION)
+                writer.write_batch(_record_batch(rows, schema))
+                written += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if written:
+        # Readers never see a half-written month
+        os.replace(tmp_path, path)
+    elif os.path.exists(path):
+        # The month is empty now; an earlier export would otherwise keep serving its old rows
+        os.remove(path)
+    return written
+
+def months_to_export(conn, table, before):
+    """First days of the months in `table` that end on or before `before`."""
+    date_column = TABLES[table][0]
+    cutoff = month_start(before)
+    with conn.cursor() as cur:
+        if is_partitioned(cur, table):
+            return [lower for _, lower, upper in list_partitions(cur, table) if upper and upper <= cutoff]
+        cur.execute(f"""
+            SELECT DISTINCT date_trunc('month', {date_column})::date FROM {table}
+            WHERE {date_column} < %s ORDER BY 1
+        """, (cutoff,))
+        return [row[0] for row in cur.fetchall()]
+
+# === Query mode (Parquet only, no Postgres) ===
+def dataset(table, root=COLD_STORAGE_DIR):
+    require_pyarrow()
+    return ds.dataset(os.path.join(root, table), format="parquet", partitioning="hive")
+
+def read_listings(table, unique_ids=None, start=None, end=None, columns=None, root=COLD_STORAGE_DIR):
+    """
+    Archived rows as a pyarrow Table, filtered by card and/or [start, end) date.
+    `.to_pandas()` / `.to_pylist()` on the result for analysis scripts.
+    """
+    date_column = TABLES[table][0]
+    condition = None
+    for expr in (
+        ds.field("unique_id").isin(list(unique_ids)) if unique_ids else None,
+        ds.field(date_column) >= start if start else None,
+        ds.field(date_column) < end if end else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+    return dataset(table, root).to_table(columns=columns, filter=condition)
+
+def query(sql, root=COLD_STORAGE_DIR):
+    """Runs `sql` against the archived tables (one view per table) with DuckDB. Returns a DataFrame."""
+    if duckdb is None:
+        raise RuntimeError("❌ SQL query mode needs duckdb (pip install duckdb); read_listings() works with pyarrow alone")
+    con = duckdb.connect()
+    for table in TABLES:
+        if exported_months(table, root):
+            pattern = os.path.join(root, table, "*", "*.parquet")
+            con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)")
+    return con.execute(sql).fetchdf()
+
+# === Filter-rule replay ===
+def replay_filters(since=None, until=None, root=COLD_STORAGE_DIR):
+    """
+    Re-runs today's price/title rules over archived sold listings and reports which listings
+    would flip compared with what was recorded at scrape time. The 90-day date rule depends
+    on when the scrape ran, so it is carried over as recorded.
+    """
+    date_column = TABLES["raw_ebay_sold_debug"][0]
+    condition = None
+    if since:
+        condition = ds.field(date_column) >= since
+    if until:
+        until_expr = ds.field(date_column) < until
+        condition = until_expr if condition is None else condition & until_expr
+
+    totals = Counter()
+    samples = defaultdict(list)
+    scanner = dataset("raw_ebay_sold_debug", root).scanner(
+        columns=["query_used", "title", "price", "included", "reason_excluded"], filter=condition
+    )
+    for batch in scanner.to_batches():
+        by_query = defaultdict(list)
+        for row in batch.to_pylist():
+            by_query[row["query_used"] or ""].append(row)
+
+        for query_used, rows in by_query.items():
+            character, digits = parse_card_meta(query_used)
+            titles_ok = is_valid_titles([r["title"] or "" for r in rows], character, digits)
+            for row, title_ok in zip(rows, titles_ok):
+                recorded = set(filter(None, (row["reason_excluded"] or "").split(",")))
+                reasons = {"date"} & recorded
+                if not is_valid_price(row["price"]):
+                    reasons.add("price")
+                if not title_ok:
+                    reasons.add("title")
+
+                totals["listings"] += 1
+                now_included = not reasons
+                if now_included and not row["included"]:
+                    change = "now included"
+                elif row["included"] and not now_included:
+                    change = f"now excluded ({','.join(sorted(reasons))})"
+                else:
+                    continue
+                totals[change] += 1
+                if len(samples[change]) < REPLAY_SAMPLE_TITLES:
+                    samples[change].append(row["title"])
+    return totals, samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export months of raw listings to Parquet")
+    export.add_argument("--table", choices=sorted(TABLES), help="Only this table")
+    export.add_argument("--month", help="One month, YYYY-MM")
+    export.add_argument("--before", help="Every month ending on or before this date (default: today)")
+    export.add_argument("--root", default=COLD_STORAGE_DIR)
+    q = sub.add_parser("query", help="Run SQL over the archive with DuckDB")
+    q.add_argument("sql")
+    q.add_argument("--root", default=COLD_STORAGE_DIR)
+    replay = sub.add_parser("replay", help="Replay current filter rules over archived sold listings")
+    replay.add_argument("--since", type=date.fromisoformat)
+    replay.add_argument("--until", type=date.fromisoformat)
+    replay.add_argument("--root", default=COLD_STORAGE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        tables = [args.table] if args.table else list(TABLES)
+        with db.connection() as conn:
+            for table in tables:
+                if args.month:
+                    months = [date.fromisoformat(f"{args.month}-01")]
+                else:
+                    before = date.fromisoformat(args.before) if args.before else date.today()
+                    months = months_to_export(conn, table, before)
+                for month in months:
+                    rows = export_month(conn, table, month, args.root)
+                    print(f"🧊 {table} {month:%Y-%m}: {rows} rows → {month_dir(table, month, args.root)}")
+    elif args.command == "query":
+        print(query(args.sql, args.root).to_string())
+    else:
+        totals, samples = replay_filters(args.since, args.until, args.root)
+        print(f"🔁 Replayed {totals.pop('listings', 0)} archived sold listings")
+        for change, count in totals.most_common():
+            print(f"   {change}: {count}")
+            for title in samples[change]:
+                print(f"      · {title}")
+
+if __name__ == "__main__":
+    main()
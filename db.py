@@ -0,0 +1,138 @@
+# db.py
+# Shared Postgres connections for every entry point. Scripts used to build their own engine or
+# call psycopg2.connect per insert, so a burst of failures meant a burst of fresh TCP + TLS
+# handshakes against the hosted database. Here each process gets:
+#   - async pools (SQLAlchemy + asyncpg), one per name, created lazily and kept warm
+#   - one sync psycopg2 pool for the scripts that are still synchronous
+#   - server-side cursor helpers for reading big tables without loading them into memory
+# Connections live for POOL_RECYCLE_SECONDS, so the TLS session is paid for once per connection
+# rather than once per statement; TCP keepalives stop the proxy dropping idle ones.
+
+import os
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# === Config ===
+load_dotenv()
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+CONNECT_TIMEOUT_SECONDS = int(os.getenv("DB_CONNECT_TIMEOUT", "15"))
+# asyncpg prepared statements per connection; the scrapers repeat a handful of statements endlessly
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+SYNC_POOL_MAX = int(os.getenv("DB_SYNC_POOL_MAX", "4"))
+# Rows fetched per round-trip by the server-side cursor helpers
+STREAM_BATCH_ROWS = int(os.getenv("DB_STREAM_BATCH_ROWS", "2000"))
+# Optional: "require", "verify-full"... (psycopg2 sslmode names; asyncpg accepts the same)
+SSL_MODE = os.getenv("DB_SSLMODE")
+
+KEEPALIVES = {"keepalives": 1, "keepalives_idle": 60, "keepalives_interval": 15, "keepalives_count": 4}
+
+def database_url(sync=False):
+    """DATABASE_URL with the driver each side needs: asyncpg for async, plain postgresql for psycopg2."""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("❌ DATABASE_URL not found in environment.")
+    _, rest = url.split("://", 1)
+    return f"postgresql://{rest}" if sync else f"postgresql+asyncpg://{rest}"
+
+# === Async pools ===
+_engines = {}
+_session_factories = {}
+
+def async_engine(name="default", pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW):
+    """
+    One engine per `name` per process. Pool sizes only apply the first time a name is used;
+    a separate name (e.g. "write") gives a workload its own pool so it can't starve the others.
+    """
+    if name not in _engines:
+        connect_args = {
+            "timeout": CONNECT_TIMEOUT_SECONDS,
+            "statement_cache_size": STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+        }
+        if SSL_MODE:
+            connect_args["ssl"] = SSL_MODE
+        _engines[name] = create_async_engine(
+            database_url(),
+            echo=False,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=POOL_TIMEOUT_SECONDS,
+            pool_recycle=POOL_RECYCLE_SECONDS,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+    return _engines[name]
+
+def session_factory(name="default", **pool):
+    if name not in _session_factories:
+        _session_factories[name] = async_sessionmaker(async_engine(name, **pool), expire_on_commit=False)
+    return _session_factories[name]
+
+def async_session():
+    """`async with async_session() as session:` on the default pool."""
+    return session_factory()()
+
+async def dispose_async_engines():
+    # Engines are bound to the event loop that first used them: call before that loop ends
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    _session_factories.clear()
+
+async def stream_rows(session, statement, params=None, batch_size=STREAM_BATCH_ROWS):
+    """Yields rows from a server-side cursor, `batch_size` per round-trip."""
+    result = await session.stream(statement, params or {}, execution_options={"yield_per": batch_size})
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
+
+# === Sync pool (psycopg2) ===
+_sync_pool = None
+
+def sync_pool():
+    global _sync_pool
+    if _sync_pool is None:
+        options = dict(KEEPALIVES, connect_timeout=CONNECT_TIMEOUT_SECONDS)
+        if SSL_MODE:
+            options["sslmode"] = SSL_MODE
+        _sync_pool = ThreadedConnectionPool(1, SYNC_POOL_MAX, database_url(sync=True), **options)
+    return _sync_pool
+
+@contextmanager
+def connection():
+    """
+    A pooled psycopg2 connection: commits on success, rolls back on error, then goes back
+    to the pool (or is discarded if the server dropped it).
+    """
+    pool = sync_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+@contextmanager
+def server_cursor(conn, name, itersize=STREAM_BATCH_ROWS, cursor_factory=None):
+    """Named (server-side) cursor: iterating it fetches `itersize` rows per round-trip."""
+    cur = conn.cursor(name=name, cursor_factory=cursor_factory)
+    cur.itersize = itersize
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+def close_sync_pool():
+    global _sync_pool
+    if _sync_pool is not None:
+        _sync_pool.closeall()
+        _sync_pool = None
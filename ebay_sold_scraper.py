@@ -2,31 +2,36 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import asyncio
+import argparse
 import json
 from datetime import datetime
 from collections import defaultdict
 from dotenv import load_dotenv
-from sqlmodel import select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import text
-from utils import filter_outliers, calculate_median, calculate_average
-from archive.scraper import parse_ebay_sold_page
+from utils import filter_outliers, calculate_median, calculate_average, group_cards_by_query
+from archive.scraper import EBAY_BASE_URL, async_parse_ebay_sold_history, close_async_client, shutdown_parse_pool
+from rate_limiter import MAX_CONCURRENCY
+from pipeline import Pipeline, Stage
+from write_behind import WriteBehindBuffer, Write, POOL_SIZE as WRITE_POOL_SIZE
+from scrape_state import state_write
+from title_matcher import KeywordMatcher
+import response_cache
+import db
 import re
 import urllib.parse
 
 # === Load config
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = db.session_factory()
+# Scrape output is batched across cards and committed on its own small pool
+write_buffer = WriteBehindBuffer(db.session_factory("write", pool_size=WRITE_POOL_SIZE, max_overflow=0))
 
 # === Config
+DAILY_COLUMNS = (
+    "unique_id", "sold_date", "median_price", "average_price",
+    "sale_count", "query_used", "urls_used"
+)
 BATCH_SIZE = 50
-CONCURRENT_SCRAPE_LIMIT = 5
-CARD_SCRAPE_DELAY = 0.7
 MAX_RESULTS = 240
 
 EXCLUSION_KEYWORDS = [
@@ -37,9 +42,10 @@ EXCLUSION_KEYWORDS = [
     "menu", "all cards", "selection", "1st edition", "1st ed", "first edition", "shadowless"
 ]
 EXCLUSION_STRING = " ".join(EXCLUSION_KEYWORDS)
+EXCLUSION_MATCHER = KeywordMatcher(EXCLUSION_KEYWORDS)
 
 def build_search_url(query: str) -> str:
-    base_url = "https://www.ebay.co.uk/sch/i.html"
+    base_url = f"{EBAY_BASE_URL}/sch/i.html"
     params = {
         "_nkw": query,
         "LH_Sold": "1",
@@ -58,7 +64,7 @@ def build_search_url(query: str) -> str:
 def should_include_listing(title: str, price_text: str, card_number_digits: str, character: str) -> bool:
     title_lower = title.lower()
     title_digits = re.sub(r"[^\d]", "", title)
-    if any(kw in title_lower for kw in EXCLUSION_KEYWORDS):
+    if EXCLUSION_MATCHER.matches(title_lower):
         return False
     if " to " in price_text.lower() or "0.00" in price_text:
         return False
@@ -70,124 +76,117 @@ def should_include_listing(title: str, price_text: str, card_number_digits: str,
         return False
     return True
 
-async def scrape_card(unique_id, query, semaphore, completed_set):
-    if unique_id in completed_set:
-        print(f"Skipping {unique_id} - already scraped")
+def aggregate_card(unique_id, query, results, fetch_error=None):
+    """Daily rows for one card from its query's sold listings; no DB access."""
+    print(f"\nScraping eBay sold for: {query} ({unique_id})")
+    search_url = build_search_url(query)
+    print(f"Search URL: {search_url}")
+    plan = {"unique_id": unique_id, "query": query, "search_url": search_url, "error": fetch_error, "daily": []}
+    if fetch_error is not None:
+        return plan
+    plan["truncated"] = results.get("truncated", False)
+
+    urls_used_tracker = defaultdict(set)
+    grouped = defaultdict(list)
+
+    character, _, card_number = query.partition(" ")
+    card_number_digits = re.sub(r"[^\d]", "", card_number)
+
+    for item in results.get("raw", []):
+        title = item.get("title", "").strip()
+        price = item.get("price")
+        sold_date = item.get("sold_date")
+        url = item.get("url")
+        if not title or price is None or not sold_date or not url:
+            continue
+
+        if not should_include_listing(title, str(price), card_number_digits, character):
+            continue
+
+        try:
+            dt = datetime.strptime(sold_date, "%Y-%m-%d")
+            grouped[dt.date()].append(price)
+            urls_used_tracker[dt.date()].add(url)
+        except Exception:
+            continue
+
+    for sold_date, prices in grouped.items():
+        filtered_step1 = filter_outliers(prices)
+        median_val = calculate_median(filtered_step1)
+        if median_val == 0 or median_val is None:
+            final_filtered = []
+        else:
+            threshold = 0.5 if median_val > 10 else 0.4
+            final_filtered = [p for p in filtered_step1 if abs(p - median_val) / median_val <= threshold]
+
+        plan["daily"].append({
+            "unique_id": unique_id,
+            "sold_date": sold_date,
+            "median_price": calculate_median(final_filtered),
+            "average_price": calculate_average(final_filtered),
+            "sale_count": len(final_filtered),
+            "query_used": query,
+            "urls_used": json.dumps(list(urls_used_tracker.get(sold_date, [])))
+        })
+    return plan
+
+def report_write(future, ok_message, failed_message):
+    future.add_done_callback(lambda f: print(ok_message if f.result() else failed_message))
+
+async def write_card(plan):
+    """Queues the card's rows on the write-behind buffer; the commit happens in a later flush."""
+    unique_id, query, search_url = plan["unique_id"], plan["query"], plan["search_url"]
+    if plan["error"] is not None:
+        print(f"Scrape error for {unique_id}: {plan['error']}")
+        future = await write_buffer.submit([Write(
+            "scrape_failures", ("unique_id", "scraper_source", "error_message", "urls_used"),
+            [(unique_id, "ebay_sold", str(plan["error"]), json.dumps([search_url]))]
+        ), state_write("sold", unique_id, ok=False)], label=unique_id)
+        report_write(future, f"Logged scrape error for {unique_id}", f"Failed to log scrape error for {unique_id}")
+        return
+
+    if not plan["daily"]:
+        print(f"No valid prices for {unique_id}, logging null result.")
+        future = await write_buffer.submit([Write(
+            "ebay_sold_nulls", ("unique_id", "query_used", "logged_at", "urls_used"),
+            [(unique_id, query, datetime.utcnow(), json.dumps([search_url]))]
+        ), state_write("sold", unique_id, detail="null")], label=unique_id)
+        report_write(future, f"Logged null for {unique_id}", f"Failed to log null for {unique_id}")
         return
 
-    async with semaphore:
-        async with async_session() as session:
-            print(f"\nScraping eBay sold for: {query} ({unique_id})")
-            urls_used_tracker = defaultdict(set)
-            search_url = build_search_url(query)
-            print(f"Search URL: {search_url}")
-
-            try:
-                results = parse_ebay_sold_page(query, max_items=MAX_RESULTS)
-            except Exception as e:
-                print(f"Scrape error for {unique_id}: {e}")
-                try:
-                    await session.execute(text("""
-                        INSERT INTO scrape_failures (unique_id, scraper_source, error_message, urls_used)
-                        VALUES (:unique_id, :scraper_source, :error_message, :urls_used)
-                    """), {
-                        "unique_id": unique_id,
-                        "scraper_source": "ebay_sold",
-                        "error_message": str(e),
-                        "urls_used": json.dumps([search_url])
-                    })
-                    await session.commit()
-                except Exception as inner:
-                    print(f"Failed to log scrape error for {unique_id}: {inner}")
-                await asyncio.sleep(CARD_SCRAPE_DELAY)
-                return
-
-            grouped = defaultdict(list)
-            listings_by_date = defaultdict(list)
-
-            for item in results:
-                title = item.get("title", "").strip()
-                price = item.get("price")
-                sold_date = item.get("sold_date")
-                url = item.get("url")
-                if not title or price is None or not sold_date or not url:
-                    continue
-
-                price_text = str(price)
-                character, _, card_number = query.partition(" ")
-                card_number_digits = re.sub(r"[^\d]", "", card_number)
-
-                if not should_include_listing(title, price_text, card_number_digits, character):
-                    continue
-
-                try:
-                    dt = datetime.strptime(sold_date, "%Y-%m-%d")
-                    grouped[dt.date()].append(price)
-                    listings_by_date[dt.date()].append({
-                        "title": title,
-                        "price": price,
-                        "url": url
-                    })
-                    urls_used_tracker[dt.date()].add(url)
-                except Exception:
-                    continue
-
-            if not grouped:
-                print(f"No valid prices for {unique_id}, logging null result.")
-                try:
-                    await session.execute(text("""
-                        INSERT INTO ebay_sold_nulls (unique_id, query_used, logged_at, urls_used)
-                        VALUES (:unique_id, :query_used, :logged_at, :urls_used)
-                    """), {
-                        "unique_id": unique_id,
-                        "query_used": query,
-                        "logged_at": datetime.utcnow(),
-                        "urls_used": json.dumps([search_url])
-                    })
-                    await session.commit()
-                except Exception as e:
-                    print(f"Failed to log null for {unique_id}: {e}")
-                await asyncio.sleep(CARD_SCRAPE_DELAY)
-                return
-
-            for sold_date, prices in grouped.items():
-                filtered_step1 = filter_outliers(prices)
-                median_val = calculate_median(filtered_step1)
-                if median_val == 0 or median_val is None:
-                    final_filtered = []
-                else:
-                    threshold = 0.5 if median_val > 10 else 0.4
-                    final_filtered = [p for p in filtered_step1 if abs(p - median_val) / median_val <= threshold]
-
-                median_price = calculate_median(final_filtered)
-                average_price = calculate_average(final_filtered)
-                sale_count = len(final_filtered)
-                url_list = list(urls_used_tracker.get(sold_date, []))
-
-                try:
-                    await session.execute(text("""
-                        INSERT INTO dailypricelog (
-                            unique_id, sold_date, median_price, average_price,
-                            sale_count, query_used, urls_used
-                        )
-                        VALUES (:unique_id, :sold_date, :median_price, :average_price,
-                                :sale_count, :query_used, :urls_used)
-                    """), {
-                        "unique_id": unique_id,
-                        "sold_date": sold_date,
-                        "median_price": median_price,
-                        "average_price": average_price,
-                        "sale_count": sale_count,
-                        "query_used": query,
-                        "urls_used": json.dumps(url_list)
-                    })
-                    await session.commit()
-                    print(f"Logged {sale_count} sales for {unique_id} on {sold_date}")
-                except Exception as e:
-                    print(f"DB insert error for {unique_id} on {sold_date}: {e}")
-                    await session.rollback()
-
-            await asyncio.sleep(CARD_SCRAPE_DELAY)
+    # All of a card's days land together; re-scraped days are replaced
+    rows = [tuple(row[c] for c in DAILY_COLUMNS) for row in plan["daily"]]
+    future = await write_buffer.submit(
+        [
+            Write("dailypricelog", DAILY_COLUMNS, rows, ("unique_id", "sold_date")),
+            # A truncated history isn't a complete scrape: record it without stamping last_sold_scrape
+            state_write("sold", unique_id, ok=False, detail="truncated") if plan["truncated"] else state_write("sold", unique_id),
+        ],
+        label=unique_id
+    )
+    report_write(
+        future,
+        f"Logged {sum(row['sale_count'] for row in plan['daily'])} sales for {unique_id} across {len(rows)} days",
+        f"DB upsert error for {unique_id}"
+    )
+
+# === Pipeline stages: one fetch per distinct query fans out to every card sharing it
+async def fetch_group(group):
+    query = " ".join(group[0]["query"].split())
+    results, fetch_error = None, None
+    try:
+        results = await async_parse_ebay_sold_history(query)
+    except Exception as e:
+        fetch_error = e
+    return group, results, fetch_error
+
+async def aggregate_group(fetched):
+    group, results, fetch_error = fetched
+    return [aggregate_card(c["unique_id"], c["query"], results, fetch_error) for c in group]
+
+async def write_group(plans):
+    for plan in plans:
+        await write_card(plan)
 
 async def run_ebay_sold_scraper():
     async with async_session() as session:
@@ -201,12 +200,31 @@ async def run_ebay_sold_scraper():
         result = await session.execute(text("SELECT unique_id, query FROM mastercard_v2"))
         cards = result.fetchall()
 
-    semaphore = asyncio.Semaphore(CONCURRENT_SCRAPE_LIMIT)
-    tasks = [
-        scrape_card(unique_id, query, semaphore, completed_set)
-        for unique_id, query in cards
-    ]
-    await asyncio.gather(*tasks)
+    pending = []
+    for unique_id, query in cards:
+        if unique_id in completed_set:
+            print(f"Skipping {unique_id} - already scraped")
+            continue
+        pending.append({"unique_id": unique_id, "query": query})
+
+    groups = group_cards_by_query(pending)
+    print(f"Scraping {len(pending)} cards across {len(groups)} distinct queries")
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch_group, concurrency=MAX_CONCURRENCY),
+        Stage("aggregate", aggregate_group, concurrency=1),
+        Stage("write", write_group, concurrency=1),
+    ])
+    try:
+        await pipeline.run(groups.values())
+    finally:
+        await write_buffer.close()
+        await close_async_client()
+        shutdown_parse_pool()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", action="store_true", help="Re-parse stored eBay pages from the response cache without touching the network")
+    args = parser.parse_args()
+    response_cache.set_replay(args.replay)
     asyncio.run(run_ebay_sold_scraper())
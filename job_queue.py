@@ -0,0 +1,108 @@
+# job_queue.py
+# Postgres work queue for eBay scraping: the controller enqueues due cards into scrape_jobs,
+# any number of workers claim batches with FOR UPDATE SKIP LOCKED and hold them under a lease.
+# A worker that dies stops heartbeating; once its lease expires the jobs are claimable again.
+# Table: migrations/0002_scrape_jobs.sql
+
+import os
+import socket
+from sqlalchemy import text
+
+# === Config ===
+LEASE_SECONDS = int(os.getenv("SCRAPE_JOB_LEASE_SECONDS", "600"))
+CLAIM_BATCH_SIZE = int(os.getenv("SCRAPE_JOB_BATCH_SIZE", "50"))
+MAX_ATTEMPTS = int(os.getenv("SCRAPE_JOB_MAX_ATTEMPTS", "3"))
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# === Controller side (sync, psycopg2) ===
+def enqueue_cards(conn, cards):
+    """Adds a pending job per card that doesn't already have an open one. Returns the number added."""
+    from psycopg2.extras import execute_values
+
+    rows = [(c["unique_id"], " ".join(c["query"].split()), c.get("tier")) for c in cards if c.get("query")]
+    with conn.cursor() as cur:
+        inserted = execute_values(cur, """
+            INSERT INTO scrape_jobs (unique_id, query, tier)
+            VALUES %s
+            ON CONFLICT (unique_id) WHERE status IN ('pending', 'leased') DO NOTHING
+            RETURNING id
+        """, rows, fetch=True)
+    conn.commit()
+    return len(inserted)
+
+# === Worker side (async session) ===
+async def claim_jobs(session, worker, limit=CLAIM_BATCH_SIZE):
+    """
+    Leases up to `limit` pending jobs (or jobs whose lease ran out) to `worker`.
+    Returns card dicts shaped like cards_due.json entries plus their job_id.
+    """
+    # Leases that expired too many times are given up on instead of being handed out again
+    await session.execute(text("""
+        UPDATE scrape_jobs
+        SET status = 'failed', finished_at = NOW(),
+            last_error = COALESCE(last_error, 'lease expired')
+        WHERE status = 'leased' AND lease_expires_at < NOW() AND attempts >= :max_attempts
+    """), {"max_attempts": MAX_ATTEMPTS})
+
+    result = await session.execute(text("""
+        UPDATE scrape_jobs
+        SET status = 'leased',
+            leased_by = :worker,
+            attempts = attempts + 1,
+            heartbeat_at = NOW(),
+            lease_expires_at = NOW() + make_interval(secs => :lease)
+        WHERE id IN (
+            SELECT id FROM scrape_jobs
+            WHERE status = 'pending'
+               OR (status = 'leased' AND lease_expires_at < NOW())
+            ORDER BY enqueued_at, id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, unique_id, query, tier
+    """), {"worker": worker, "lease": float(LEASE_SECONDS), "limit": limit})
+    claimed = [
+        {"job_id": job_id, "unique_id": uid, "query": query, "tier": tier}
+        for job_id, uid, query, tier in result.fetchall()
+    ]
+    await session.commit()
+    return claimed
+
+async def heartbeat(session, worker, job_ids):
+    # Only extends leases this worker still holds; a reclaimed job stays with its new owner
+    if not job_ids:
+        return
+    await session.execute(text("""
+        UPDATE scrape_jobs
+        SET heartbeat_at = NOW(), lease_expires_at = NOW() + make_interval(secs => :lease)
+        WHERE id = ANY(:ids) AND leased_by = :worker AND status = 'leased'
+    """), {"ids": list(job_ids), "worker": worker, "lease": float(LEASE_SECONDS)})
+    await session.commit()
+
+async def complete_jobs(session, worker, job_ids):
+    if not job_ids:
+        return
+    await session.execute(text("""
+        UPDATE scrape_jobs
+        SET status = 'done', finished_at = NOW(), lease_expires_at = NULL, last_error = NULL
+        WHERE id = ANY(:ids) AND leased_by = :worker AND status = 'leased'
+    """), {"ids": list(job_ids), "worker": worker})
+    await session.commit()
+
+async def fail_job(session, worker, job_id, error):
+    # Back to pending for another worker until MAX_ATTEMPTS is used up
+    await session.execute(text("""
+        UPDATE scrape_jobs
+        SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+            finished_at = CASE WHEN attempts >= :max_attempts THEN NOW() END,
+            lease_expires_at = NULL,
+            last_error = :error
+        WHERE id = :id AND leased_by = :worker AND status = 'leased'
+    """), {"id": job_id, "worker": worker, "error": str(error)[:1000], "max_attempts": MAX_ATTEMPTS})
+    await session.commit()
+
+async def queue_counts(session):
+    result = await session.execute(text("SELECT status, COUNT(*) FROM scrape_jobs GROUP BY status"))
+    return dict(result.fetchall())
@@ -0,0 +1,207 @@
+# migrate.py
+# Versioned schema migrations for the CardCatch tables, plus an EXPLAIN report for the queries
+# the scripts run every night. Migrations are the numbered .sql files in migrations/, applied in
+# order, each in its own transaction, and recorded in schema_migrations.
+# Usage:
+#   python migrate.py up [--dry-run]       apply pending migrations
+#   python migrate.py status               applied / pending / edited-after-apply
+#   python migrate.py explain [--analyze]  flag sequential scans in the hot queries
+
+import os
+import re
+import json
+import hashlib
+import argparse
+import db
+
+# === Config ===
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+# Any constant works; it only has to be the same for every process running migrations
+ADVISORY_LOCK_KEY = 7340511
+# Sequential scans on tables smaller than this are cheaper than an index and aren't flagged
+SEQ_SCAN_MIN_ROWS = 10000
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+"""
+
+# Queries the scripts issue on every run, with representative parameters
+HOT_QUERIES = [
+    ("controller: candidate cards", """
+        SELECT m.unique_id, m.query, m.tier, m.clean_avg_value, m.hot_character,
+               s.last_scrape,
+               (w.unique_id IS NOT NULL) AS wishlist,
+               (i.unique_id IS NOT NULL) AS inventory
+        FROM mastercard_v2 m
+        LEFT JOIN card_scrape_state s ON s.unique_id = m.unique_id
+        LEFT JOIN (SELECT DISTINCT unique_id FROM wishlist) w ON m.unique_id = w.unique_id
+        LEFT JOIN (SELECT DISTINCT unique_id FROM inventory) i ON m.unique_id = i.unique_id
+        WHERE m.query IS NOT NULL AND m.query <> ''
+    """, ()),
+    ("controller: price volatility", """
+        SELECT unique_id, STDDEV_SAMP(median_price) / NULLIF(AVG(median_price), 0) AS volatility
+        FROM dailypricelog
+        WHERE median_price IS NOT NULL AND sold_date >= CURRENT_DATE - %s
+        GROUP BY unique_id
+        HAVING COUNT(*) >= 2
+    """, (30,)),
+    ("scraper: watermark fallback", """
+        SELECT unique_id, MAX(sold_date) FROM dailypricelog
+        WHERE unique_id = ANY(%s)
+        GROUP BY unique_id
+    """, (["sv1-1", "sv1-2"],)),
+    ("scraper: daily upsert conflict lookup", """
+        SELECT id FROM dailypricelog WHERE unique_id = %s AND sold_date = CURRENT_DATE
+    """, ("sv1-1",)),
+    ("post-scrape: recent sold prices", """
+        SELECT unique_id, median_price FROM dailypricelog
+        WHERE median_price IS NOT NULL AND trusted = TRUE AND sold_date >= CURRENT_DATE - 90
+    """, ()),
+    ("tcg: latest price for a card", """
+        SELECT market_price, low_price FROM tcg_pricing_log
+        WHERE unique_id = %s ORDER BY date_logged DESC LIMIT 1
+    """, ("sv1-1",)),
+    ("api: card lookup", """
+        SELECT * FROM mastercard_v2 WHERE unique_id = %s
+    """, ("sv1-1",)),
+]
+
+# === Migration files ===
+def load_migrations(directory=MIGRATIONS_DIR):
+    """[(version, name, sql, checksum)] sorted by version."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            sql = f.read()
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()[:16]
+        migrations.append((match.group(1), match.group(2), sql, checksum))
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"❌ Duplicate migration versions in {directory}")
+    return migrations
+
+def applied_migrations(cur):
+    cur.execute(SCHEMA_MIGRATIONS_DDL)
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cur.fetchall())
+
+def pending_migrations(cur):
+    applied = applied_migrations(cur)
+    return [m for m in load_migrations() if m[0] not in applied]
+
+# === up ===
+def migrate(conn, dry_run=False):
+    """Applies every pending migration in order; stops at the first failure. Returns versions applied."""
+    done = []
+    with conn.cursor() as cur:
+        # Two deploys starting together must not both run the same migration
+        cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+        try:
+            pending = pending_migrations(cur)
+            conn.commit()
+            if not pending:
+                print("✅ Schema is up to date")
+            for version, name, sql, checksum in pending:
+                if dry_run:
+                    print(f"🧪 Would apply {version}_{name}")
+                    continue
+                print(f"🔧 Applying {version}_{name}...")
+                try:
+                    cur.execute(sql)
+                    cur.execute("""
+                        INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)
+                    """, (version, name, checksum))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    print(f"❌ {version}_{name} failed, rolled back: {e}")
+                    raise
+                done.append(version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+            conn.commit()
+    return done
+
+def print_status(conn):
+    with conn.cursor() as cur:
+        applied = applied_migrations(cur)
+    for version, name, _, checksum in load_migrations():
+        if version not in applied:
+            state = "⏳ pending"
+        elif applied[version] != checksum:
+            state = "⚠️ applied, file edited since"
+        else:
+            state = "✅ applied"
+        print(f"{state:<32} {version}_{name}")
+
+# === explain ===
+def seq_scans(plan):
+    """Yields (relation, estimated rows) for every Seq Scan node in an EXPLAIN (FORMAT JSON) plan."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name"), plan.get("Plan Rows", 0)
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+def table_rows(cur, relation):
+    cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (relation,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def explain_report(conn, analyze=False):
+    """Prints each hot query's plan cost and flags sequential scans on large tables. Returns the flag count."""
+    flagged = 0
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    with conn.cursor() as cur:
+        for label, sql, params in HOT_QUERIES:
+            try:
+                cur.execute(f"EXPLAIN ({options}) {sql}", params)
+                raw = cur.fetchone()[0]
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ {label}: could not explain ({e})")
+                continue
+
+            timing = f", {plan['Actual Total Time']:.1f}ms" if analyze else ""
+            print(f"\n🔎 {label} (cost {plan['Total Cost']:.0f}{timing})")
+            for relation, estimated in seq_scans(plan):
+                rows = table_rows(cur, relation)
+                if rows >= SEQ_SCAN_MIN_ROWS:
+                    flagged += 1
+                    print(f"   🐢 Seq Scan on {relation} (~{rows} rows in table, ~{estimated} expected)")
+                else:
+                    print(f"   · Seq Scan on small table {relation} (~{rows} rows)")
+            # EXPLAIN ANALYZE really runs the query; nothing here should stick
+            conn.rollback()
+    print(f"\n{'✅ No' if not flagged else f'⚠️ {flagged}'} sequential scans on large tables")
+    return flagged
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("up", help="Apply pending migrations")
+    up.add_argument("--dry-run", action="store_true", help="Only list what would be applied")
+    sub.add_parser("status", help="Show applied and pending migrations")
+    explain = sub.add_parser("explain", help="EXPLAIN the hot queries and flag sequential scans")
+    explain.add_argument("--analyze", action="store_true", help="Run the queries (EXPLAIN ANALYZE) for real timings")
+    args = parser.parse_args()
+
+    with db.connection() as conn:
+        if args.command == "up":
+            migrate(conn, args.dry_run)
+        elif args.command == "status":
+            print_status(conn)
+        else:
+            explain_report(conn, args.analyze)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+-- Tables the later migrations and the scripts assume, formerly made by create_all on API boot
+-- (models/models.py) or by hand. IF NOT EXISTS: a no-op on databases that already have them.
+-- Columns follow what the scripts read and write; partitions.py convert partitions the logs later.
+CREATE TABLE IF NOT EXISTS mastercard_v2 (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL UNIQUE,
+    card_name TEXT,
+    set_name TEXT,
+    card_number TEXT,
+    card_number_raw TEXT,
+    card_id TEXT,
+    query TEXT,
+    set_code TEXT,
+    set_id TEXT,
+    series TEXT,
+    supertype TEXT,
+    subtypes JSONB,
+    rarity TEXT,
+    artist TEXT,
+    types JSONB,
+    type TEXT,
+    release_date DATE,
+    language TEXT,
+    hot_character BOOLEAN,
+    card_image_url TEXT,
+    set_logo_url TEXT,
+    set_symbol_url TEXT,
+    -- Written by update_clean_and_tiers.py / populate_mastercard_v2.py / tcg_price_updater.py
+    tier INTEGER,
+    clean_avg_value NUMERIC,
+    verified_sales_logged INTEGER,
+    price_range_seen_min NUMERIC,
+    price_range_seen_max NUMERIC,
+    sold_ebay_median NUMERIC,
+    active_ebay_median NUMERIC,
+    active_ebay_lowest NUMERIC,
+    tcg_market_price NUMERIC,
+    tcgplayer_market_price NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS dailypricelog (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    sold_date DATE NOT NULL,
+    median_price NUMERIC,
+    average_price NUMERIC,
+    sale_count INTEGER,
+    query_used TEXT,
+    card_number TEXT,
+    urls_used JSONB,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS activedailypricelog (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    active_date DATE NOT NULL,
+    median_price NUMERIC,
+    average_price NUMERIC,
+    sale_count INTEGER,
+    query_used TEXT,
+    card_number TEXT,
+    url_used TEXT,
+    lowest_price NUMERIC,
+    trusted BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- unique_id here is the normalised TCG card ID (tcg_price_updater.normalize_card_id)
+CREATE TABLE IF NOT EXISTS tcg_pricing_log (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    market_price NUMERIC,
+    low_price NUMERIC,
+    date_logged DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS raw_ebay_sold_debug (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    query_used TEXT,
+    title TEXT,
+    price NUMERIC,
+    sold_date DATE,
+    url TEXT,
+    condition TEXT,
+    holo_type TEXT,
+    included BOOLEAN,
+    reason_excluded TEXT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS raw_ebay_active (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    query TEXT,
+    title TEXT,
+    price NUMERIC,
+    quantity INTEGER,
+    date DATE,
+    url TEXT,
+    condition TEXT,
+    holo_type TEXT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS ebay_sold_nulls (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    query_used TEXT,
+    search_url TEXT,
+    reason TEXT,
+    urls_used JSONB,
+    logged_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS wishlist (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scrape_failures (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT,
+    scraper_source TEXT,
+    error_message TEXT,
+    urls_used JSONB,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS post_scrape_log (
+    id SERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    log_time TIMESTAMP NOT NULL DEFAULT NOW(),
+    changes JSONB
+);
@@ -0,0 +1,2 @@
+-- Formerly added at runtime by historical_pricelog_cleanse.py
+ALTER TABLE dailypricelog ADD COLUMN IF NOT EXISTS trusted BOOLEAN DEFAULT TRUE;
@@ -0,0 +1,22 @@
+-- Work queue for eBay scrape workers (job_queue.py)
+CREATE TABLE IF NOT EXISTS scrape_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    tier INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    leased_by TEXT,
+    lease_expires_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    last_error TEXT,
+    enqueued_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- At most one open job per card, so re-running the controller doesn't pile up duplicates
+CREATE UNIQUE INDEX IF NOT EXISTS scrape_jobs_open_card
+ON scrape_jobs (unique_id) WHERE status IN ('pending', 'leased');
+
+CREATE INDEX IF NOT EXISTS scrape_jobs_claimable
+ON scrape_jobs (status, lease_expires_at, enqueued_at);
@@ -0,0 +1,15 @@
+-- Resumable cards_due.json runs (checkpoint.py)
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    run_id TEXT PRIMARY KEY,
+    total_cards INTEGER NOT NULL,
+    started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scrape_run_progress (
+    run_id TEXT NOT NULL,
+    unique_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    completed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (run_id, unique_id, stage)
+);
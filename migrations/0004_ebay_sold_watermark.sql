@@ -0,0 +1,7 @@
+-- Per-card incremental sold scraping (watermark.py)
+CREATE TABLE IF NOT EXISTS ebay_sold_watermark (
+    unique_id TEXT PRIMARY KEY,
+    last_sold_date DATE NOT NULL,
+    seen_item_ids JSONB NOT NULL DEFAULT '[]',
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,28 @@
+-- One row per card and day, as the scrapers' ON CONFLICT upserts expect.
+-- Existing duplicates are removed first, keeping the newest (latest created_at, then highest id).
+LOCK TABLE dailypricelog IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM dailypricelog t
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY unique_id, sold_date
+        ORDER BY created_at DESC NULLS LAST, id DESC
+    ) AS rn
+    FROM dailypricelog
+) ranked
+WHERE t.id = ranked.id AND ranked.rn > 1;
+-- Also serves the (unique_id, sold_date) lookups
+CREATE UNIQUE INDEX IF NOT EXISTS dailypricelog_card_day_key
+ON dailypricelog (unique_id, sold_date);
+
+LOCK TABLE activedailypricelog IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM activedailypricelog t
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY unique_id, active_date
+        ORDER BY created_at DESC NULLS LAST, id DESC
+    ) AS rn
+    FROM activedailypricelog
+) ranked
+WHERE t.id = ranked.id AND ranked.rn > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS activedailypricelog_card_day_key
+ON activedailypricelog (unique_id, active_date);
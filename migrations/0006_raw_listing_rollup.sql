@@ -0,0 +1,15 @@
+-- Per-card monthly summaries of raw listing partitions dropped by `partitions.py rollup`
+CREATE TABLE IF NOT EXISTS raw_listing_rollup (
+    source TEXT NOT NULL,
+    unique_id TEXT NOT NULL,
+    month DATE NOT NULL,
+    listings INTEGER NOT NULL,
+    priced_listings INTEGER NOT NULL,
+    included_listings INTEGER,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    avg_price NUMERIC,
+    median_price NUMERIC,
+    rolled_up_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (source, unique_id, month)
+);
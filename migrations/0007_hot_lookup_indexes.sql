@@ -0,0 +1,24 @@
+-- Indexes for the lookups the scrapers, controller and post-scrape update run every night.
+-- dailypricelog (unique_id, sold_date) is covered by dailypricelog_card_day_key (0005).
+CREATE INDEX IF NOT EXISTS activedailypricelog_card_created
+ON activedailypricelog (unique_id, created_at);
+
+CREATE INDEX IF NOT EXISTS dailypricelog_card_created
+ON dailypricelog (unique_id, created_at);
+
+CREATE INDEX IF NOT EXISTS tcg_pricing_log_card_logged
+ON tcg_pricing_log (unique_id, date_logged);
+
+CREATE INDEX IF NOT EXISTS mastercard_v2_unique_id
+ON mastercard_v2 (unique_id);
+
+CREATE INDEX IF NOT EXISTS wishlist_unique_id ON wishlist (unique_id);
+CREATE INDEX IF NOT EXISTS inventory_unique_id ON inventory (unique_id);
+
+CREATE INDEX IF NOT EXISTS raw_ebay_sold_debug_card_date
+ON raw_ebay_sold_debug (unique_id, sold_date);
+
+CREATE INDEX IF NOT EXISTS raw_ebay_active_card_date
+ON raw_ebay_active (unique_id, date);
+
+CREATE INDEX IF NOT EXISTS ebay_sold_nulls_unique_id ON ebay_sold_nulls (unique_id);
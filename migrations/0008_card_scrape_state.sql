@@ -0,0 +1,30 @@
+-- Per-card scrape state (scrape_state.py), kept up to date by the scrapers as each card finishes.
+-- The controller reads last_scrape from here instead of MAX(created_at) over both price logs.
+CREATE TABLE IF NOT EXISTS card_scrape_state (
+    unique_id TEXT PRIMARY KEY,
+    last_sold_scrape TIMESTAMP,
+    last_active_scrape TIMESTAMP,
+    last_tcg_fetch TIMESTAMP,
+    -- GREATEST ignores NULLs: whichever eBay side ran most recently
+    last_scrape TIMESTAMP GENERATED ALWAYS AS (GREATEST(last_sold_scrape, last_active_scrape)) STORED,
+    last_outcome TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Backfill from the history the controller used to scan on every run.
+-- tcg_pricing_log stores normalised (upper-case) IDs, so it is matched back to mastercard_v2.
+INSERT INTO card_scrape_state (unique_id, last_sold_scrape, last_active_scrape, last_tcg_fetch, last_outcome)
+SELECT unique_id, MAX(sold), MAX(active), MAX(tcg), 'backfill'
+FROM (
+    SELECT unique_id, created_at AS sold, NULL::timestamp AS active, NULL::timestamp AS tcg
+    FROM dailypricelog
+    UNION ALL
+    SELECT unique_id, NULL, created_at, NULL
+    FROM activedailypricelog
+    UNION ALL
+    SELECT m.unique_id, NULL, NULL, t.date_logged::timestamp
+    FROM tcg_pricing_log t
+    JOIN mastercard_v2 m ON UPPER(m.unique_id) = UPPER(t.unique_id)
+) seen
+GROUP BY unique_id
+ON CONFLICT (unique_id) DO NOTHING;
@@ -0,0 +1,2 @@
+-- Attempt counter for resumable runs (checkpoint.py): a run that keeps failing is given up on
+ALTER TABLE scrape_runs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,3 @@
+-- mastercard_v2.unique_id is already UNIQUE, so the btree 0007 adds on it is a second,
+-- redundant index; 0007 itself stays as applied so its checksum still matches
+DROP INDEX IF EXISTS mastercard_v2_unique_id;
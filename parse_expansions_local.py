@@ -1,4 +1,3 @@
-import os
 import re
 import asyncio
 from bs4 import BeautifulSoup
@@ -7,16 +6,12 @@ from dotenv import load_dotenv
 from sqlalchemy import (
     Column, String, Integer, Date, Text, MetaData, Table
 )
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.dialects.postgresql import insert
+import db
 
 # === Load environment ===
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = db.async_engine()
 metadata = MetaData()
 
 # === Define DB Table ===
@@ -90,13 +85,9 @@ def parse_local_expansions():
 
 # === Async insert logic ===
 async def main():
-    async with engine.begin() as conn:
-        await conn.run_sync(metadata.create_all)
-
     expansions = parse_local_expansions()
 
-    async_session = async_sessionmaker(engine, expire_on_commit=False)
-    async with async_session() as session:
+    async with db.async_session() as session:
         for card in expansions:
             stmt = insert(mastercard_v2).values(card).on_conflict_do_nothing()
             await session.execute(stmt)
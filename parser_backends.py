@@ -0,0 +1,122 @@
+# parser_backends.py
+# Pluggable HTML backends for eBay result pages.
+# Each backend turns a results page into Listing records; archive/scraper.py builds raw/filtered dicts from them.
+
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
+
+# title / price_text / url are None when the tag is missing; sold_date is a date or None
+Listing = namedtuple("Listing", ["title", "price_text", "url", "sold_date"])
+
+SOLD_DATE_PATTERN = re.compile(r"(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})")
+
+def parse_sold_text(text):
+    # `text` is a lowercased span text; returns (matched, date)
+    match = SOLD_DATE_PATTERN.search(text)
+    if not match:
+        return False, None
+    try:
+        return True, datetime.strptime(match.group(0), "%d %b %Y").date()
+    except ValueError:
+        return True, None
+
+def extract_sold_date(item):
+    for span in item.find_all("span"):
+        text = span.get_text(strip=True).lower()
+        if text.startswith("sold"):
+            matched, sold_date = parse_sold_text(text)
+            if matched:
+                return sold_date
+    return None
+
+# === BeautifulSoup (html.parser) — reference implementation ===
+class SoupBackend:
+    name = "bs4"
+
+    def extract(self, html, sold=False):
+        soup = BeautifulSoup(html, "html.parser")
+        listings = []
+        for item in soup.select(".s-item"):
+            title_tag = item.select_one(".s-item__title")
+            price_tag = item.select_one(".s-item__price")
+            link_tag = item.select_one(".s-item__link")
+            listings.append(Listing(
+                title=title_tag.text.strip() if title_tag else None,
+                price_text=price_tag.text if price_tag else None,
+                url=link_tag.get("href") if link_tag else None,
+                sold_date=extract_sold_date(item) if sold else None
+            ))
+        return listings
+
+# === lxml — compiled XPath, no soup tree ===
+def _class_xpath(class_name, first=False):
+    expr = f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    if first:
+        expr = f"({expr})[1]"
+    return etree.XPath(expr)
+
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self):
+        if lxml_html is None:
+            raise RuntimeError("lxml is not installed; use EBAY_PARSER_BACKEND=bs4")
+        self._items = _class_xpath("s-item")
+        self._title = _class_xpath("s-item__title", first=True)
+        self._price = _class_xpath("s-item__price", first=True)
+        self._link = _class_xpath("s-item__link", first=True)
+
+    def _sold_date(self, item):
+        for span in item.iterdescendants("span"):
+            # Mirrors BeautifulSoup's get_text(strip=True): stripped text nodes joined with ""
+            text = "".join(t.strip() for t in span.itertext()).lower()
+            if text.startswith("sold"):
+                matched, sold_date = parse_sold_text(text)
+                if matched:
+                    return sold_date
+        return None
+
+    def extract(self, html, sold=False):
+        if not html or not html.strip():
+            return []
+        root = lxml_html.fromstring(html)
+        listings = []
+        for item in self._items(root):
+            title_tag = self._title(item)
+            price_tag = self._price(item)
+            link_tag = self._link(item)
+            listings.append(Listing(
+                title=title_tag[0].text_content().strip() if title_tag else None,
+                price_text=price_tag[0].text_content() if price_tag else None,
+                url=link_tag[0].get("href") if link_tag else None,
+                sold_date=self._sold_date(item) if sold else None
+            ))
+        return listings
+
+BACKENDS = {
+    "bs4": SoupBackend,
+    "lxml": LxmlBackend,
+}
+
+DEFAULT_BACKEND = "lxml" if lxml_html is not None else "bs4"
+
+_backend = None
+
+def get_parser_backend(name=None):
+    global _backend
+    if name:
+        return BACKENDS[name]()
+    if _backend is None:
+        _backend = BACKENDS[os.getenv("EBAY_PARSER_BACKEND", DEFAULT_BACKEND)]()
+    return _backend
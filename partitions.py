@@ -0,0 +1,265 @@
+# partitions.py
+# Monthly range partitioning for the price logs and raw listing tables, plus the maintenance
+# that keeps it going: future partitions are created ahead of time, and raw listing partitions
+# past the retention window are rolled up into per-card monthly summaries (raw_listing_rollup)
+# and dropped (table: migrations/0006_raw_listing_rollup.sql).
+# Usage:
+#   python partitions.py convert [--table T]          one-off: heap table -> partitioned, data copied
+#   python partitions.py create [--months-ahead N]    make sure upcoming monthly partitions exist
+#   python partitions.py rollup [--keep-days N] [--export DIR] [--dry-run]
+#   python partitions.py status
+
+import re
+import argparse
+from datetime import date, timedelta
+import db
+
+# === Config ===
+# table -> partition key (a DATE column)
+PARTITIONED_TABLES = {
+    "dailypricelog": "sold_date",
+    "activedailypricelog": "active_date",
+    "raw_ebay_sold_debug": "sold_date",
+    "raw_ebay_active": "date",
+}
+MONTHS_AHEAD = 3
+# Raw listings older than this are only kept as raw_listing_rollup rows
+RAW_KEEP_DAYS = 120
+
+# raw table -> (rollup source label, included-listings expression)
+RAW_TABLES = {
+    "raw_ebay_sold_debug": ("sold", "COUNT(*) FILTER (WHERE included)"),
+    "raw_ebay_active": ("active", "NULL"),
+}
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+# === Month helpers ===
+def month_start(day):
+    return day.replace(day=1)
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+# === Catalog lookups ===
+def index_columns(index_def):
+    # "CREATE UNIQUE INDEX x ON public.t USING btree (unique_id, sold_date)" -> ["unique_id", "sold_date"]
+    columns = index_def[index_def.index("(") + 1:index_def.rindex(")")]
+    return [c.strip().strip('"') for c in columns.split(",")]
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+def list_partitions(cur, table):
+    """[(partition name, first day, first day of the next month)]; the default partition has no bounds."""
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    partitions = []
+    for name, bound in cur.fetchall():
+        match = BOUND_PATTERN.search(bound or "")
+        if match:
+            lower, upper = (date.fromisoformat(v[:10]) for v in match.groups())
+            partitions.append((name, lower, upper))
+        else:
+            partitions.append((name, None, None))
+    return partitions
+
+def create_partition(cur, table, month):
+    name = partition_name(table, month)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}
+        FOR VALUES FROM (%s) TO (%s)
+    """, (month.isoformat(), add_months(month, 1).isoformat()))
+    return name
+
+# === create: upcoming partitions ===
+def create_future_partitions(conn, months_ahead=MONTHS_AHEAD, today=None):
+    """Ensures this month's and the next `months_ahead` months' partitions exist. Returns names created."""
+    this_month = month_start(today or date.today())
+    created = []
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cur, table):
+                continue
+            existing = {name for name, _, _ in list_partitions(cur, table)}
+            for n in range(months_ahead + 1):
+                month = add_months(this_month, n)
+                if partition_name(table, month) not in existing:
+                    created.append(create_partition(cur, table, month))
+    conn.commit()
+    return created
+
+# === convert: heap table -> partitioned ===
+def convert_table(conn, table, column, months_ahead=MONTHS_AHEAD):
+    """
+    Rebuilds `table` as a monthly-partitioned table with the same columns, defaults and data.
+    Runs in one transaction with the table locked; rolled back if the row counts don't match.
+    """
+    legacy = f"{table}_legacy"
+    with conn.cursor() as cur:
+        if is_partitioned(cur, table):
+            print(f"⏭️ {table} is already partitioned")
+            return
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cur.execute(f"SELECT MIN({column}), MAX({column}), COUNT(*) FROM {table}")
+        first, last, total = cur.fetchone()
+
+        # Indexes come back on the new parent; the primary key can't (it doesn't include the partition key)
+        cur.execute("""
+            SELECT pg_get_indexdef(i.indexrelid), i.indisunique
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary
+        """, (table,))
+        index_defs = cur.fetchall()
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'id'
+        """, (table,))
+        has_id = cur.fetchone() is not None
+
+        cur.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        cur.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})")
+        if has_id:
+            # The old serial/identity sequence belongs to the legacy table and goes with it
+            cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {table}_part_id_seq")
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_part_id_seq')")
+
+        this_month = month_start(date.today())
+        month = month_start(first) if first else this_month
+        end = max(add_months(this_month, months_ahead), month_start(last) if last else this_month)
+        while month <= end:
+            create_partition(cur, table, month)
+            month = add_months(month, 1)
+        # Rows with no date land here instead of failing the insert
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+        cur.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        copied = cur.rowcount
+        if copied != total:
+            conn.rollback()
+            raise RuntimeError(f"❌ {table}: copied {copied} of {total} rows, rolled back")
+        if has_id:
+            cur.execute(f"""
+                SELECT setval('{table}_part_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)
+            """)
+            cur.execute(f"ALTER SEQUENCE {table}_part_id_seq OWNED BY {table}.id")
+
+        cur.execute(f"DROP TABLE {legacy}")
+        for index_def, unique in index_defs:
+            if unique and column not in index_columns(index_def):
+                print(f"⚠️ {table}: skipping unique index without the partition key: {index_def}")
+                continue
+            cur.execute(index_def)
+        if has_id:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_id_idx ON {table} (id)")
+    conn.commit()
+    print(f"✅ {table}: {copied} rows moved into monthly partitions on {column}")
+
+# === rollup: raw partitions past retention -> raw_listing_rollup ===
+def rollup_raw_partitions(conn, keep_days=RAW_KEEP_DAYS, dry_run=False, today=None, export_root=None):
+    """
+    Summarises and drops raw listing partitions that ended before the retention window.
+    With `export_root`, each partition is first archived to Parquet (cold_storage.py) and
+    only dropped if every row made it into the file.
+    """
+    if export_root:
+        from cold_storage import export_month
+    cutoff = month_start((today or date.today()) - timedelta(days=keep_days))
+    with conn.cursor() as cur:
+        for table, (source, included_expr) in RAW_TABLES.items():
+            if not is_partitioned(cur, table):
+                print(f"⏭️ {table} is not partitioned yet; run convert first")
+                continue
+            for name, lower, upper in list_partitions(cur, table):
+                if upper is None or upper > cutoff:
+                    continue
+                if dry_run:
+                    cur.execute(f"SELECT COUNT(*) FROM {name}")
+                    print(f"🧪 Would roll up {name}: {cur.fetchone()[0]} rows")
+                    continue
+
+                if export_root:
+                    cur.execute(f"SELECT COUNT(*) FROM {name}")
+                    expected = cur.fetchone()[0]
+                    exported = export_month(conn, table, lower, export_root)
+                    if exported != expected:
+                        print(f"⚠️ {name}: exported {exported} of {expected} rows; keeping the partition")
+                        continue
+
+                # Summary and drop commit together, so a failure leaves the raw rows in place
+                cur.execute(f"""
+                    INSERT INTO raw_listing_rollup (
+                        source, unique_id, month, listings, priced_listings, included_listings,
+                        min_price, max_price, avg_price, median_price
+                    )
+                    SELECT %s, unique_id, %s, COUNT(*), COUNT(price), {included_expr},
+                           MIN(price), MAX(price), AVG(price),
+                           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price)
+                    FROM {name}
+                    GROUP BY unique_id
+                    ON CONFLICT (source, unique_id, month) DO UPDATE
+                    SET listings = EXCLUDED.listings,
+                        priced_listings = EXCLUDED.priced_listings,
+                        included_listings = EXCLUDED.included_listings,
+                        min_price = EXCLUDED.min_price,
+                        max_price = EXCLUDED.max_price,
+                        avg_price = EXCLUDED.avg_price,
+                        median_price = EXCLUDED.median_price,
+                        rolled_up_at = NOW()
+                """, (source, lower))
+                cards = cur.rowcount
+                cur.execute(f"DROP TABLE {name}")
+                conn.commit()
+                print(f"📦 {name}: rolled up into {cards} card summaries and dropped")
+
+def print_status(conn):
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cur, table):
+                print(f"📄 {table}: not partitioned")
+                continue
+            partitions = list_partitions(cur, table)
+            dated = [p for p in partitions if p[1] is not None]
+            span = f"{dated[0][1]} → {dated[-1][2]}" if dated else "no monthly partitions"
+            print(f"🗂️ {table}: {len(partitions)} partitions ({span})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="One-off: rebuild heap tables as monthly-partitioned tables")
+    convert.add_argument("--table", choices=sorted(PARTITIONED_TABLES), help="Only this table")
+    convert.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    create = sub.add_parser("create", help="Create upcoming monthly partitions")
+    create.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    rollup = sub.add_parser("rollup", help="Summarise and drop raw listing partitions past retention")
+    rollup.add_argument("--keep-days", type=int, default=RAW_KEEP_DAYS)
+    rollup.add_argument("--export", metavar="DIR", help="Archive each partition to Parquet under DIR before dropping it")
+    rollup.add_argument("--dry-run", action="store_true", help="Only report which partitions would go")
+    sub.add_parser("status", help="List partitioned tables and their range")
+    args = parser.parse_args()
+
+    with db.connection() as conn:
+        if args.command == "convert":
+            tables = [args.table] if args.table else list(PARTITIONED_TABLES)
+            for table in tables:
+                convert_table(conn, table, PARTITIONED_TABLES[table], args.months_ahead)
+        elif args.command == "create":
+            created = create_future_partitions(conn, args.months_ahead)
+            print(f"✅ Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+        elif args.command == "rollup":
+            rollup_raw_partitions(conn, args.keep_days, args.dry_run, export_root=args.export)
+        else:
+            print_status(conn)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# pipeline.py
+# Staged async pipeline for the scrapers: fetch → aggregate → write, each stage with its own
+# worker count and a bounded input queue. When a stage falls behind (usually Postgres) its queue
+# fills and the stages before it wait on put(), instead of every card holding a DB session.
+# Periodic reports show each stage's queue depth, busy workers, throughput and utilisation.
+
+import time
+import asyncio
+import traceback
+
+REPORT_EVERY_SECONDS = 15.0
+
+_DONE = object()
+
+class Stage:
+    def __init__(self, name, handler, concurrency=1, queue_size=None):
+        """
+        `handler(item)` is awaited once per item; its return value goes to the next stage
+        (None drops the item). Exceptions are counted and logged, and the item is dropped.
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue_size = queue_size or concurrency * 2
+        self.queue = None
+        self.processed = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        # Time spent waiting for room in the next stage's queue: downstream backpressure
+        self.blocked_seconds = 0.0
+
+    def stats(self, elapsed):
+        worker_seconds = max(elapsed * self.concurrency, 1e-9)
+        return {
+            "stage": self.name,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "errors": self.errors,
+            "per_sec": self.processed / elapsed if elapsed else 0.0,
+            "utilisation": self.busy_seconds / worker_seconds,
+            "blocked": self.blocked_seconds / worker_seconds,
+        }
+
+class Pipeline:
+    def __init__(self, stages, report_every=REPORT_EVERY_SECONDS):
+        self.stages = stages
+        self.report_every = report_every
+        self.started = None
+
+    async def _worker(self, stage, next_stage):
+        while True:
+            item = await stage.queue.get()
+            if item is _DONE:
+                return
+            stage.in_flight += 1
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.errors += 1
+                result = None
+                print(f"❌ [{stage.name}] {e}")
+                traceback.print_exc()
+            finally:
+                stage.busy_seconds += time.monotonic() - started
+                stage.in_flight -= 1
+            stage.processed += 1
+
+            if result is not None and next_stage is not None:
+                waited = time.monotonic()
+                await next_stage.queue.put(result)
+                stage.blocked_seconds += time.monotonic() - waited
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_every)
+            self.report()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return [stage.stats(elapsed) for stage in self.stages]
+
+    def report(self, final=False):
+        stats = self.stats()
+        print(f"\n📊 Pipeline {'summary' if final else 'status'} ({time.monotonic() - self.started:.0f}s)")
+        for s in stats:
+            print(
+                f"   {s['stage']:<10} queue {s['queued']:>4}/{s['queue_size']:<4} | {s['in_flight']:>3} busy | "
+                f"{s['processed']:>6} done ({s['per_sec']:.2f}/s) | {s['errors']} errors | "
+                f"util {s['utilisation']:.0%} | blocked {s['blocked']:.0%}"
+            )
+        if final and stats:
+            bottleneck = max(stats, key=lambda s: s["utilisation"])
+            print(f"   🐌 Busiest stage: {bottleneck['stage']} ({bottleneck['utilisation']:.0%} utilised)")
+
+    async def run(self, items):
+        self.started = time.monotonic()
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+
+        workers = []
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            workers.append([asyncio.create_task(self._worker(stage, next_stage)) for _ in range(stage.concurrency)])
+        reporter = asyncio.create_task(self._report_loop()) if self.report_every else None
+
+        try:
+            for item in items:
+                await self.stages[0].queue.put(item)
+            # Drain stage by stage: a stage's input is complete once every upstream worker has exited
+            for stage, stage_workers in zip(self.stages, workers):
+                for _ in stage_workers:
+                    await stage.queue.put(_DONE)
+                await asyncio.gather(*stage_workers)
+        finally:
+            if reporter:
+                reporter.cancel()
+            for task in (t for stage_workers in workers for t in stage_workers):
+                task.cancel()
+
+        self.report(final=True)
+        return self.stats()
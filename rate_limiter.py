@@ -0,0 +1,122 @@
+# rate_limiter.py
+# Shared per-host rate limiting for the eBay scrapers:
+# a token bucket per host plus AIMD concurrency (grow while healthy, halve on pushback)
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+# === Config ===
+INITIAL_CONCURRENCY = int(os.getenv("SCRAPE_INITIAL_CONCURRENCY", "5"))
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "16"))
+REQUESTS_PER_SECOND = float(os.getenv("SCRAPE_REQUESTS_PER_SECOND", "4"))
+BURST = int(os.getenv("SCRAPE_BURST", "4"))
+PUSHBACK_PAUSE = float(os.getenv("SCRAPE_PUSHBACK_PAUSE", "20"))
+
+# Several in-flight requests usually fail together; treat them as one congestion event
+DECREASE_COOLDOWN = 2.0
+
+BLOCK_MARKERS = ("Expensive keywords",)
+
+def is_pushback(status_code, body):
+    if status_code == 429:
+        return "429"
+    # A failing server is congestion too: back off rather than speed up against it
+    if status_code >= 500:
+        return str(status_code)
+    if body and any(marker in body for marker in BLOCK_MARKERS):
+        return "blocked"
+    return None
+
+class HostLimiter:
+    def __init__(self, host):
+        self.host = host
+        self.limit = float(INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.tokens = float(BURST)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.pushbacks = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            await self._take_token()
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(BURST, self.tokens + (now - self.last_refill) * REQUESTS_PER_SECOND)
+            self.last_refill = now
+
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / REQUESTS_PER_SECOND)
+
+    def record_success(self):
+        self.successes += 1
+        # Additive increase: roughly +1 slot per window of `limit` healthy responses
+        self.limit = min(MAX_CONCURRENCY, self.limit + 1 / self.limit)
+
+    def record_pushback(self, reason):
+        self.pushbacks += 1
+        now = time.monotonic()
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return
+        self.last_decrease = now
+        self.limit = max(MIN_CONCURRENCY, self.limit / 2)
+        self.tokens = 0.0
+        self.paused_until = now + PUSHBACK_PAUSE
+        print(f"🐢 {self.host} pushback ({reason}) → concurrency {int(self.limit)}, pausing {PUSHBACK_PAUSE:.0f}s")
+
+class AdaptiveLimiter:
+    def __init__(self):
+        self.hosts = {}
+
+    def for_url(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(host)
+        return self.hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = self.for_url(url)
+        await host.acquire()
+        try:
+            yield host
+        finally:
+            await host.release()
+
+    def summary(self):
+        return {
+            host: {
+                "concurrency": int(h.limit),
+                "successes": h.successes,
+                "pushbacks": h.pushbacks
+            }
+            for host, h in self.hosts.items()
+        }
+
+# One limiter per process, shared by every scraper that fetches through archive/scraper.py
+ebay_limiter = AdaptiveLimiter()
@@ -0,0 +1,82 @@
+# response_cache.py
+# Content-addressed on-disk store of raw eBay search pages.
+# Entries are keyed by the fully-built search URL, zstd-compressed, and fresh for a per-mode TTL.
+# Replay mode serves stored pages regardless of age and never touches the network.
+
+import os
+import hashlib
+import tempfile
+import time
+
+import zstandard
+
+# === Config ===
+CACHE_DIR = os.getenv("EBAY_CACHE_DIR", ".ebay_cache")
+TTL_SECONDS = {
+    "sold": int(os.getenv("EBAY_CACHE_TTL_SOLD", str(12 * 3600))),
+    "active": int(os.getenv("EBAY_CACHE_TTL_ACTIVE", str(2 * 3600))),
+}
+COMPRESSION_LEVEL = 3
+
+_replay = os.getenv("EBAY_CACHE_REPLAY") == "1"
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+
+def set_replay(enabled):
+    global _replay
+    _replay = bool(enabled)
+    if _replay:
+        print(f"📼 Replay mode: serving stored pages from {CACHE_DIR}, no network")
+
+def is_replay():
+    return _replay
+
+def cache_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def entry_path(url, mode):
+    key = cache_key(url)
+    return os.path.join(CACHE_DIR, mode, key[:2], f"{key}.html.zst")
+
+def get(url, mode):
+    path = entry_path(url, mode)
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        _stats["misses"] += 1
+        return None
+
+    if not _replay and age > TTL_SECONDS[mode]:
+        _stats["misses"] += 1
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            html = zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+    except (OSError, zstandard.ZstdError) as e:
+        print(f"⚠️ Unreadable cache entry {path}: {e}")
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    return html
+
+def put(url, mode, html):
+    path = entry_path(url, mode)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(html.encode("utf-8"))
+
+    # Write-then-rename so concurrent scripts never read a half-written entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not store cache entry {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    _stats["stores"] += 1
+
+def stats():
+    return dict(_stats)
@@ -0,0 +1,103 @@
+# scheduler.py
+# Picks which cards to scrape next. Every card gets a priority score
+# (staleness × value × volatility × wishlist/inventory/hot flags) and the highest scores
+# are taken until the run's eBay request budget is spent.
+
+import os
+import math
+from datetime import datetime, date
+
+# === Config ===
+REQUEST_BUDGET = int(os.getenv("SCRAPE_REQUEST_BUDGET", "3000"))
+# Sold page + active page per distinct query; cards sharing a query ride along for free
+REQUESTS_PER_QUERY = 2
+# Past this many days a card is simply "very stale"; never-scraped cards count as this
+STALENESS_CAP_DAYS = 30
+# Cards without a known value are treated as this (roughly the catalogue's typical card)
+DEFAULT_VALUE = 5.0
+VOLATILITY_WINDOW_DAYS = 30
+VOLATILITY_WEIGHT = 2.0
+# No price history yet: assume middling volatility rather than none
+DEFAULT_VOLATILITY = 0.25
+OWNED_BOOST = 3.0   # wishlist or inventory
+HOT_BOOST = 1.5
+
+def staleness_factor(last_scrape, today):
+    if last_scrape is None:
+        return float(STALENESS_CAP_DAYS)
+    if isinstance(last_scrape, datetime):
+        last_scrape = last_scrape.date()
+    return float(min(max((today - last_scrape).days, 0), STALENESS_CAP_DAYS))
+
+def value_factor(value):
+    # Log scale: a £200 card matters more than a £2 one, but not 100x more
+    return 1 + math.log1p(value if value and value > 0 else DEFAULT_VALUE)
+
+def volatility_factor(cv):
+    cv = DEFAULT_VOLATILITY if cv is None else min(float(cv), 1.0)
+    return 1 + VOLATILITY_WEIGHT * cv
+
+def flag_factor(wishlist, inventory, hot):
+    factor = OWNED_BOOST if (wishlist or inventory) else 1.0
+    return factor * (HOT_BOOST if hot else 1.0)
+
+def score_card(card, today=None):
+    today = today or date.today()
+    return (
+        staleness_factor(card.get("last_scrape"), today)
+        * value_factor(card.get("clean_avg_value"))
+        * volatility_factor(card.get("volatility"))
+        * flag_factor(card.get("wishlist"), card.get("inventory"), card.get("hot_character"))
+    )
+
+def pick_due_cards(cards, budget=REQUEST_BUDGET, today=None):
+    """
+    Highest-scoring cards first until `budget` requests are used.
+    Cards scraped today score 0 and are never picked.
+    """
+    today = today or date.today()
+    scored = sorted(((score_card(c, today), c) for c in cards), key=lambda sc: sc[0], reverse=True)
+
+    picked, queries, spent = [], set(), 0
+    for score, card in scored:
+        if score <= 0:
+            break
+        query_key = " ".join(card["query"].split()).lower()
+        cost = 0 if query_key in queries else REQUESTS_PER_QUERY
+        if spent + cost > budget:
+            continue
+        spent += cost
+        queries.add(query_key)
+        picked.append({"unique_id": card["unique_id"], "query": card["query"], "tier": card["tier"], "priority": round(score, 3)})
+    return picked, spent
+
+def load_candidates(cur):
+    """All cards with a query plus what the score needs (psycopg2 RealDictCursor)."""
+    # Last scrape comes from card_scrape_state (one row per card, kept current by the scrapers)
+    cur.execute("""
+        SELECT m.unique_id, m.query, m.tier, m.clean_avg_value, m.hot_character,
+               s.last_scrape,
+               (w.unique_id IS NOT NULL) AS wishlist,
+               (i.unique_id IS NOT NULL) AS inventory
+        FROM mastercard_v2 m
+        LEFT JOIN card_scrape_state s ON s.unique_id = m.unique_id
+        LEFT JOIN (SELECT DISTINCT unique_id FROM wishlist) w ON m.unique_id = w.unique_id
+        LEFT JOIN (SELECT DISTINCT unique_id FROM inventory) i ON m.unique_id = i.unique_id
+        WHERE m.query IS NOT NULL AND m.query <> ''
+    """)
+    cards = {row["unique_id"]: dict(row) for row in cur.fetchall()}
+
+    # Coefficient of variation of recent daily medians
+    cur.execute("""
+        SELECT unique_id, STDDEV_SAMP(median_price) / NULLIF(AVG(median_price), 0) AS volatility
+        FROM dailypricelog
+        WHERE median_price IS NOT NULL
+          AND sold_date >= CURRENT_DATE - %s
+        GROUP BY unique_id
+        HAVING COUNT(*) >= 2
+    """, (VOLATILITY_WINDOW_DAYS,))
+    for row in cur.fetchall():
+        if row["unique_id"] in cards:
+            cards[row["unique_id"]]["volatility"] = row["volatility"]
+
+    return list(cards.values())
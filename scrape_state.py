@@ -0,0 +1,41 @@
+# scrape_state.py
+# Per-card scrape state: when each source last produced data for a card, and how the latest
+# attempt went. The scrapers update it as each card finishes, so the controller reads one row
+# per card instead of taking MAX(created_at) over the whole price log history.
+# Table: migrations/0008_card_scrape_state.sql
+
+from datetime import datetime
+from psycopg2.extras import execute_values
+from write_behind import Write
+
+# source -> column stamped when that source succeeds for a card
+SOURCE_COLUMNS = {"sold": "last_sold_scrape", "active": "last_active_scrape", "tcg": "last_tcg_fetch"}
+
+def state_columns(source, ok=True):
+    """Column order of state_row(). A failure only records the outcome, not a new last-success time."""
+    if ok:
+        return ("unique_id", SOURCE_COLUMNS[source], "last_outcome", "updated_at")
+    return ("unique_id", "last_outcome", "updated_at")
+
+def state_row(source, unique_id, ok=True, detail=None, now=None):
+    now = now or datetime.utcnow()
+    outcome = f"{source}:{detail or ('ok' if ok else 'failed')}"
+    return (unique_id, now, outcome, now) if ok else (unique_id, outcome, now)
+
+def state_write(source, unique_id, ok=True, detail=None):
+    """The state upsert as a write-behind Write, to land in the same unit as the card's data."""
+    return Write("card_scrape_state", state_columns(source, ok), [state_row(source, unique_id, ok, detail)], ("unique_id",))
+
+def record_states(cur, source, unique_ids, ok=True, detail=None):
+    """Upserts one source's outcome for `unique_ids` in one round-trip (psycopg2 cursor)."""
+    columns = state_columns(source, ok)
+    now = datetime.utcnow()
+    rows = [state_row(source, uid, ok, detail, now) for uid in dict.fromkeys(unique_ids)]
+    if not rows:
+        return 0
+    update = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns[1:])
+    execute_values(cur, f"""
+        INSERT INTO card_scrape_state ({', '.join(columns)}) VALUES %s
+        ON CONFLICT (unique_id) DO UPDATE SET {update}
+    """, rows)
+    return len(rows)
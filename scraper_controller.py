@@ -1,39 +1,22 @@
 import os
 import sys
 import json
-import subprocess
+import asyncio
 import argparse
-from datetime import datetime, timedelta, date
-import psycopg2
+import traceback
+from datetime import datetime
 from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
-
-# === Boot log ===
-try:
-    with open("controller_boot_log.txt", "a") as f:
-        f.write(f"🟢 Started at {datetime.utcnow()}\n")
-except:
-    pass
-
-# === Load and fix env ===
-load_dotenv()
-raw_url = os.getenv("DATABASE_URL")
-if not raw_url:
-    raise RuntimeError("❌ DATABASE_URL not found in environment.")
-DATABASE_URL = raw_url.replace("postgresql+asyncpg", "postgresql")
-
-# === Tier frequency rules ===
-TIER_INTERVALS = {
-    1: timedelta(days=1),
-    2: timedelta(days=2),
-    3: timedelta(days=3),
-    4: timedelta(days=7),
-}
+import db
+from job_queue import enqueue_cards
+from partitions import create_future_partitions
+from scheduler import REQUEST_BUDGET, load_candidates, pick_due_cards
+import tcg_price_updater
+import update_clean_and_tiers
 
 # === Logging helpers ===
 def log_scrape_event(source, status, count, notes=""):
     try:
-        with psycopg2.connect(DATABASE_URL) as conn:
+        with db.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO scrape_log (source, status, card_count, notes)
@@ -45,7 +28,7 @@ def log_scrape_event(source, status, count, notes=""):
 
 def log_failure(source, message):
     try:
-        with psycopg2.connect(DATABASE_URL) as conn:
+        with db.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO scrape_failures (unique_id, scraper_source, error_message)
@@ -55,45 +38,35 @@ def log_failure(source, message):
     except Exception as e:
         print(f"❌ Failed to log scrape failure: {e}")
 
+# === Partition upkeep: next months' partitions exist before any scraper writes into them ===
+def ensure_partitions():
+    try:
+        with db.connection() as conn:
+            created = create_future_partitions(conn)
+        if created:
+            print(f"🗂️ Created partitions: {', '.join(created)}")
+    except Exception as e:
+        print(f"⚠️ Could not create upcoming partitions: {e}")
+        log_failure("controller", f"Partition upkeep failed: {e}")
+
 # === Pull cards from DB or override ===
-def load_cards_due():
+def load_cards_due(budget=REQUEST_BUDGET):
     if os.path.exists("cards_due.json"):
         print("📁 Loading card list from cards_due.json override...")
         with open("cards_due.json", "r") as f:
             return json.load(f)
 
-    print("📱 Connecting to DB and checking for due cards...")
-    today = date.today()
+    print("📱 Connecting to DB and scoring cards for this run...")
     due_cards = []
 
     try:
-        with psycopg2.connect(DATABASE_URL, connect_timeout=15) as conn:
+        with db.connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                print("✅ DB connected. Pulling cards and scrape timestamps...")
-
-                cur.execute("""SELECT unique_id, query, tier FROM mastercard_v2 WHERE tier IS NOT NULL""")
-                cards = cur.fetchall()
-
-                cur.execute("""SELECT unique_id, MAX(created_at) AS last_scrape FROM dailypricelog GROUP BY unique_id""")
-                sold_seen = {row["unique_id"]: row["last_scrape"] for row in cur.fetchall()}
-
-                cur.execute("""SELECT unique_id, MAX(created_at) AS last_scrape FROM activedailypricelog GROUP BY unique_id""")
-                active_seen = {row["unique_id"]: row["last_scrape"] for row in cur.fetchall()}
-
-                for card in cards:
-                    tier = card["tier"]
-                    threshold = TIER_INTERVALS.get(tier)
-                    if not threshold:
-                        continue
+                print("✅ DB connected. Pulling cards, scrape timestamps and price history...")
+                candidates = load_candidates(cur)
 
-                    uid = card["unique_id"]
-                    latest_scrape_date = max(
-                        (sold_seen.get(uid) or datetime(2000, 1, 1)).date(),
-                        (active_seen.get(uid) or datetime(2000, 1, 1)).date()
-                    )
-
-                    if (today - latest_scrape_date) >= threshold:
-                        due_cards.append(card)
+        due_cards, spent = pick_due_cards(candidates, budget)
+        print(f"🎯 Picked {len(due_cards)} of {len(candidates)} cards using {spent}/{budget} eBay requests")
 
     except Exception as e:
         print(f"❌ Error during DB check: {e}")
@@ -107,7 +80,7 @@ def load_cards_due():
 def get_cards_by_tiers(tiers):
     print(f"📱 Fetching all cards in Tier(s) {tiers}...")
     try:
-        with psycopg2.connect(DATABASE_URL) as conn:
+        with db.connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 placeholders = ','.join(['%s'] * len(tiers))
                 cur.execute(f"""
@@ -121,48 +94,147 @@ def get_cards_by_tiers(tiers):
         print(f"❌ Failed to fetch tier(s): {e}")
         return []
 
-# === Script wrappers ===
-def call_dual_scraper():
+# === Work queue ===
+def enqueue_due_cards(cards):
+    # Workers (archive/scrape_ebay_dual.py --worker) pick these up from scrape_jobs
+    try:
+        with db.connection() as conn:
+            added = enqueue_cards(conn, cards)
+        print(f"📥 Enqueued {added} new jobs ({len(cards) - added} already open) in scrape_jobs")
+        log_scrape_event("ebay_queue", "enqueued", added)
+    except Exception as e:
+        print(f"❌ Failed to enqueue cards: {e}")
+        log_failure("controller", f"Enqueue failed: {e}")
+
+# === In-process run: eBay and TCG side by side, each card recomputed as soon as its sources finish ===
+# The stages share this process's db.py pools; blocking DB/HTTP work runs in threads so the
+# eBay event loop keeps fetching. Cards handed to update_clean_and_tiers per recompute call
+RECOMPUTE_BATCH_SIZE = int(os.getenv("RECOMPUTE_BATCH_SIZE", "50"))
+SOURCES = ("ebay", "tcg")
+
+class SourceTracker:
+    """Counts down each card's outstanding sources; a card is queued for recompute once none are left."""
+    def __init__(self, unique_ids, sources=SOURCES):
+        self.waiting = {uid: set(sources) for uid in unique_ids}
+        self.ready = asyncio.Queue()
+
+    def finish(self, unique_id, source):
+        left = self.waiting.get(unique_id)
+        if left is None or source not in left:
+            return
+        left.discard(source)
+        if not left:
+            del self.waiting[unique_id]
+            self.ready.put_nowait(unique_id)
+
+    def finish_all(self, source):
+        # A stage ended: cards it never reported on (skipped, failed groups) stop waiting for it
+        for uid in [uid for uid, left in self.waiting.items() if source in left]:
+            self.finish(uid, source)
+
+async def run_ebay_stage(tracker):
+    print("🚀 Running dual eBay scraper...")
     try:
-        print("🚀 Running dual eBay scraper...")
-        result = subprocess.run(
-            [sys.executable, "archive/scrape_ebay_dual.py"],
-            check=True,
-            stdout=sys.stdout,
-            stderr=sys.stderr
+        # archive/ scripts import their siblings as top-level modules
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive"))
+        import scrape_ebay_dual
+        await scrape_ebay_dual.run_dual_scraper(
+            on_card_done=lambda card, outcome: tracker.finish(card["unique_id"], "ebay")
         )
-        print(f"🔁 Scraper finished with return code {result.returncode}")
-        log_scrape_event("ebay_dual", "success", -1)
-    except subprocess.CalledProcessError as e:
+        print("🔁 eBay scraper finished")
+        await asyncio.to_thread(log_scrape_event, "ebay_dual", "success", -1)
+    except Exception as e:
         print("❌ eBay scraper failed:", e)
-        log_scrape_event("ebay_dual", "fail", 0, str(e))
-        log_failure("ebay_dual", str(e))
+        traceback.print_exc()
+        await asyncio.to_thread(log_scrape_event, "ebay_dual", "fail", 0, str(e))
+        await asyncio.to_thread(log_failure, "ebay_dual", str(e))
+    finally:
+        tracker.finish_all("ebay")
+
+async def run_tcg_stage(tracker, unique_ids):
+    print("🚀 Running TCG scraper...")
+    loop = asyncio.get_running_loop()
+
+    def batch_done(batch_ids):
+        # Called from the TCG thread
+        loop.call_soon_threadsafe(lambda: [tracker.finish(uid, "tcg") for uid in batch_ids])
 
-def call_tcg_scraper():
     try:
-        print("🚀 Running TCG scraper...")
-        result = subprocess.run(
-            [sys.executable, "tcg_price_updater.py"],
-            check=True,
-            stdout=sys.stdout,
-            stderr=sys.stderr
-        )
-        print(f"🔁 TCG scraper finished with return code {result.returncode}")
-        log_scrape_event("tcg", "success", -1)
-    except subprocess.CalledProcessError as e:
+        # tcg_price_updater is blocking (requests + psycopg2); a worker thread keeps the eBay loop free
+        await asyncio.to_thread(tcg_price_updater.run, unique_ids, batch_done)
+        print("🔁 TCG scraper finished")
+        await asyncio.to_thread(log_scrape_event, "tcg", "success", len(unique_ids))
+    except Exception as e:
         print("❌ TCG scraper failed:", e)
-        log_scrape_event("tcg", "fail", 0, str(e))
-        log_failure("tcg", str(e))
+        traceback.print_exc()
+        await asyncio.to_thread(log_scrape_event, "tcg", "fail", 0, str(e))
+        await asyncio.to_thread(log_failure, "tcg", str(e))
+    finally:
+        tracker.finish_all("tcg")
+
+async def run_recompute_stage(tracker):
+    """Recomputes clean value + tier for cards as they become ready, until a None arrives."""
+    updated = failed = 0
+    finished = False
+    while not finished:
+        uid = await tracker.ready.get()
+        if uid is None:
+            break
+        batch = [uid]
+        # Whatever else is ready goes in the same call
+        while len(batch) < RECOMPUTE_BATCH_SIZE and not tracker.ready.empty():
+            uid = tracker.ready.get_nowait()
+            if uid is None:
+                finished = True
+                break
+            batch.append(uid)
+        try:
+            updated += await asyncio.to_thread(update_clean_and_tiers.update_cards, batch)
+        except Exception as e:
+            failed += len(batch)
+            print(f"❌ Post-scrape update failed for {len(batch)} cards: {e}")
+            await asyncio.to_thread(log_failure, "post_scrape_update", str(e))
+    return updated, failed
+
+async def run_stages(due_cards):
+    """
+    eBay and TCG run at the same time in this process, sharing db.py's pools; a card's
+    clean value and tier are recomputed as soon as both sources are done with it.
+    """
+    unique_ids = list(dict.fromkeys(card["unique_id"] for card in due_cards))
+    tracker = SourceTracker(unique_ids)
+    recompute = asyncio.create_task(run_recompute_stage(tracker))
+
+    await asyncio.gather(run_ebay_stage(tracker), run_tcg_stage(tracker, unique_ids))
+    tracker.ready.put_nowait(None)
+    updated, failed = await recompute
+
+    print(f"🧶 Post-scrape update: {updated} cards updated, {failed} failed")
+    if failed:
+        await asyncio.to_thread(log_scrape_event, "post_scrape_update", "fail", updated, f"{failed} cards failed")
+    else:
+        await asyncio.to_thread(log_scrape_event, "post_scrape_update", "success", updated)
+    await asyncio.to_thread(update_clean_and_tiers.release_cards_due)
 
 # === MAIN ===
-if __name__ == "__main__":
+def main():
+    # === Boot log ===
+    try:
+        with open("controller_boot_log.txt", "a") as f:
+            f.write(f"🟢 Started at {datetime.utcnow()}\n")
+    except:
+        pass
+
     try:
         print("🟢 Starting CardCatch Scraper Controller...")
 
         parser = argparse.ArgumentParser()
         parser.add_argument("--tier", type=str, help="Comma-separated tier(s) to manually scrape, e.g. 4 or 2,5,6")
         parser.add_argument("--force-all", action="store_true", help="Force scrape all cards regardless of freshness or tier")
+        parser.add_argument("--budget", type=int, default=REQUEST_BUDGET, help="eBay requests this run may spend; highest-priority cards are picked first")
+        parser.add_argument("--enqueue", action="store_true", help="Add due cards to the scrape_jobs queue for workers instead of running the scrapers")
         args = parser.parse_args()
+        ensure_partitions()
 
         if args.tier:
             tier_values = [int(t.strip()) for t in args.tier.split(",")]
@@ -171,7 +243,7 @@ if __name__ == "__main__":
         elif getattr(args, "force_all", False):
             print("⚙️ FORCE ALL mode: scraping every card in mastercard_v2...")
             try:
-                with psycopg2.connect(DATABASE_URL) as conn:
+                with db.connection() as conn:
                     with conn.cursor(cursor_factory=RealDictCursor) as cur:
                         cur.execute("SELECT unique_id, query, tier FROM mastercard_v2 WHERE query IS NOT NULL")
                         due_cards = cur.fetchall()
@@ -181,9 +253,12 @@ if __name__ == "__main__":
                 log_failure("controller", f"Force all error: {e}")
                 due_cards = []
         else:
-            due_cards = load_cards_due()
+            due_cards = load_cards_due(args.budget)
 
-        if due_cards:
+        if due_cards and args.enqueue:
+            enqueue_due_cards(due_cards)
+            print("👷 Start workers with: python archive/scrape_ebay_dual.py --worker")
+        elif due_cards:
             try:
                 with open("cards_due.json", "w", encoding="utf-8") as f:
                     json.dump(due_cards, f, indent=2)
@@ -192,23 +267,7 @@ if __name__ == "__main__":
                 print(f"❌ Failed to write cards_due.json: {e}")
                 log_failure("controller", f"JSON write failed: {e}")
 
-            call_dual_scraper()
-            call_tcg_scraper()
-
-            try:
-                print("🧶 Running post-scrape update (clean values + tier recalculation)...")
-                result = subprocess.run(
-                    [sys.executable, "update_clean_and_tiers.py"],
-                    check=True,
-                    stdout=sys.stdout,
-                    stderr=sys.stderr
-                )
-                print(f"🔁 Post-scrape update finished with return code {result.returncode}")
-                log_scrape_event("post_scrape_update", "success", -1)
-            except subprocess.CalledProcessError as e:
-                print("❌ Post-scrape update failed:", e)
-                log_scrape_event("post_scrape_update", "fail", 0, str(e))
-                log_failure("post_scrape_update", str(e))
+            asyncio.run(run_stages(due_cards))
         else:
             print("🛋️ No cards to scrape.")
             log_scrape_event("controller", "no_due_cards", 0, "Nothing to run.")
@@ -218,3 +277,6 @@ if __name__ == "__main__":
         with open("controller_errors.txt", "a") as f:
             f.write(f"{datetime.utcnow()} FATAL: {str(e)}\n")
         log_failure("controller", str(e))
+
+if __name__ == "__main__":
+    main()
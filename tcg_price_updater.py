@@ -2,16 +2,15 @@ import os
 import re
 import json
 import requests
-import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 from datetime import date
+import db
+from scrape_state import record_states
 
 # Load env variables
 load_dotenv()
 
-# Fix DATABASE_URL for psycopg2
-DATABASE_URL = os.getenv("DATABASE_URL").replace("postgresql+asyncpg", "postgres")
 API_URL = os.getenv("TCG_API_URL", "https://cardcatchdb.onrender.com/tcg-prices-batch-async")
 API_KEY = os.getenv("API_KEY")  # Now used as x-api-key
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "333"))
@@ -30,21 +29,22 @@ def get_card_ids():
     try:
         with open("cards_due.json") as f:
             due_cards = json.load(f)
-            limited_ids = [normalize_card_id(card["unique_id"]) for card in due_cards]
+            limited_ids = [card["unique_id"] for card in due_cards]
             print(f"🔒 Scoped to {len(limited_ids)} cards from cards_due.json")
             return limited_ids
     except Exception as e:
         print(f"⚠️ Could not use cards_due.json (fallback to all): {e}")
 
     # Default full run fallback
-    with psycopg2.connect(DATABASE_URL) as conn:
+    with db.connection() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT unique_id FROM mastercard_v2 WHERE tcg_market_price IS NULL")
             rows = cur.fetchall()
             print(f"🔢 Found {len(rows)} unpriced card IDs.")
-            return [normalize_card_id(row[0]) for row in rows]
+            return [row[0] for row in rows]
 
-def insert_pricing_logs(data):
+def insert_pricing_logs(data, card_ids):
+    # card_ids: normalized ID -> [mastercard unique_ids], for card_scrape_state
     print(f"💾 Inserting pricing logs...")
     records = []
     today = date.today()
@@ -52,48 +52,63 @@ def insert_pricing_logs(data):
         if d.get("market") is None and d.get("low") is None:
             continue
         records.append((d.get("card_id"), d.get("market"), d.get("low"), today))
+    priced = {card_id for card_id, _, _, _ in records}
     if not records:
         print("⚠️ No valid pricing data to insert.")
-        return
 
-    with psycopg2.connect(DATABASE_URL) as conn:
+    with db.connection() as conn:
         with conn.cursor() as cur:
-            execute_batch(cur,
-                """
-                INSERT INTO tcg_pricing_log (unique_id, market_price, low_price, date_logged)
-                VALUES (%s, %s, %s, %s)
-                """, records
-            )
+            if records:
+                execute_batch(cur,
+                    """
+                    INSERT INTO tcg_pricing_log (unique_id, market_price, low_price, date_logged)
+                    VALUES (%s, %s, %s, %s)
+                    """, records
+                )
+            record_states(cur, "tcg", [uid for cid, uids in card_ids.items() if cid in priced for uid in uids])
+            record_states(cur, "tcg", [uid for cid, uids in card_ids.items() if cid not in priced for uid in uids], ok=False, detail="no_price")
             conn.commit()
     print(f"✅ Inserted {len(records)} pricing log records.")
 
-def log_failure(card_id, source, error_msg):
-    with psycopg2.connect(DATABASE_URL) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO scrape_failures (unique_id, scraper_source, error_message)
-                VALUES (%s, %s, %s)
-                """, (card_id, source, error_msg)
-            )
-            conn.commit()
-
-def run():
-    card_ids = get_card_ids()
+def log_failures(card_ids, source, error_msg):
+    # A failed batch is logged in one round-trip, not one connection per card
+    # card_ids: normalized ID -> [mastercard unique_ids]
+    try:
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                execute_batch(cur,
+                    """
+                    INSERT INTO scrape_failures (unique_id, scraper_source, error_message)
+                    VALUES (%s, %s, %s)
+                    """, [(card_id, source, error_msg) for card_id in card_ids]
+                )
+                record_states(cur, source, [uid for uids in card_ids.values() for uid in uids], ok=False)
+    except Exception as e:
+        print(f"❌ Failed to log {len(card_ids)} failures: {e}")
+
+def run(card_ids=None, on_batch=None):
+    """
+    Fetches and logs TCG prices for `card_ids` (mastercard unique_ids; default: cards_due.json or
+    every unpriced card). `on_batch(unique_ids)` is called as each batch finishes, priced or not.
+    """
+    if card_ids is None:
+        card_ids = get_card_ids()
     headers = {"x-api-key": API_KEY}
 
     for i in range(0, len(card_ids), BATCH_SIZE):
-        batch = card_ids[i:i + BATCH_SIZE]
-        print(f"\n🚀 Sending batch {i}–{i + len(batch)} to TCG endpoint...")
+        # Several unique_ids can normalise to the same TCG ID ("sv1-1" / "SV1-1"); each still gets its state
+        batch = {}
+        for uid in card_ids[i:i + BATCH_SIZE]:
+            batch.setdefault(normalize_card_id(uid), []).append(uid)
+        print(f"\n🚀 Sending batch {i}–{min(i + BATCH_SIZE, len(card_ids))} to TCG endpoint...")
 
         try:
-            response = requests.post(API_URL, json={"card_ids": batch}, headers=headers)
+            response = requests.post(API_URL, json={"card_ids": list(batch)}, headers=headers)
             print(f"📡 Response status: {response.status_code}")
 
             if response.status_code != 200:
                 print(f"❌ Failed batch {i}: {response.status_code} - {response.text}")
-                for card_id in batch:
-                    log_failure(card_id, "tcg", f"Batch failed with status {response.status_code}")
+                log_failures(batch, "tcg", f"Batch failed with status {response.status_code}")
                 continue
 
             results = response.json()
@@ -103,12 +118,14 @@ def run():
             else:
                 print("⚠️ No results returned from endpoint.")
 
-            insert_pricing_logs(results)
+            insert_pricing_logs(results, batch)
 
         except Exception as e:
             print(f"❌ Exception in batch {i}: {e}")
-            for card_id in batch:
-                log_failure(card_id, "tcg", str(e))
+            log_failures(batch, "tcg", str(e))
+        finally:
+            if on_batch:
+                on_batch([uid for uids in batch.values() for uid in uids])
 
 if __name__ == "__main__":
     print("🟢 TCG Price Update Script Starting...")
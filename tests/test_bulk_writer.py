@@ -0,0 +1,77 @@
+# Needs a scratch Postgres: TEST_DATABASE_URL=postgresql://... python -m pytest tests
+# Creates and drops its own tables; skipped when no database is configured.
+
+import os
+import sys
+import asyncio
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def with_tables(body):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    _, rest = TEST_DATABASE_URL.split("://", 1)
+    engine = create_async_engine(f"postgresql+asyncpg://{rest}", pool_size=2)
+    suffix = uuid.uuid4().hex[:8]
+    raw, daily = f"test_raw_{suffix}", f"test_daily_{suffix}"
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE TABLE {raw} (unique_id TEXT, price NUMERIC)"))
+            await conn.execute(text(f"CREATE TABLE {daily} (unique_id TEXT PRIMARY KEY, median_price NUMERIC NOT NULL)"))
+        await body(async_sessionmaker(engine, expire_on_commit=False), raw, daily)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {raw}, {daily}"))
+        await engine.dispose()
+
+async def count(session_factory, table):
+    from sqlalchemy import text
+    async with session_factory() as session:
+        return (await session.execute(text(f"SELECT COUNT(*) FROM {table}"))).scalar()
+
+def test_copy_rolls_back_with_the_session():
+    from bulk_writer import bulk_insert, upsert_rows
+
+    async def body(session_factory, raw, daily):
+        async with session_factory() as session:
+            # COPY is the session's first statement
+            await bulk_insert(session, raw, ("unique_id", "price"), [("sv1-1", 1.5), ("sv1-1", 2.5)])
+            with pytest.raises(Exception):
+                await upsert_rows(session, daily, ("unique_id", "median_price"), [("sv1-1", None)], ("unique_id",))
+            await session.rollback()
+        assert await count(session_factory, raw) == 0
+
+    run(with_tables(body))
+
+def test_failed_batch_leaves_no_duplicate_raw_rows():
+    from write_behind import WriteBehindBuffer, Write
+
+    async def body(session_factory, raw, daily):
+        buffer = WriteBehindBuffer(session_factory, flush_rows=1000, flush_seconds=60)
+        good = await buffer.submit([
+            Write(raw, ("unique_id", "price"), [("sv1-1", 1.5), ("sv1-1", 2.5)]),
+            Write(daily, ("unique_id", "median_price"), [("sv1-1", 2.0)], ("unique_id",)),
+        ], label="good")
+        bad = await buffer.submit([
+            Write(raw, ("unique_id", "price"), [("sv1-2", 3.0)]),
+            Write(daily, ("unique_id", "median_price"), [("sv1-2", None)], ("unique_id",)),
+        ], label="bad")
+        await buffer.close()
+
+        assert await good is True
+        assert await bad is False
+        # The merged batch failed and each unit was retried: only the good unit's raw rows, once
+        assert await count(session_factory, raw) == 2
+        assert await count(session_factory, daily) == 1
+
+    run(with_tables(body))
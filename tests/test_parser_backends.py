@@ -0,0 +1,53 @@
+# Both HTML backends must give archive/scraper.py the same listings for every saved fixture page.
+# Fixtures live in benchmarks/fixtures/ (regenerate with python benchmarks/fixtures.py).
+
+import os
+import sys
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("lxml")
+
+from parser_backends import SoupBackend, LxmlBackend
+from archive.scraper import build_sold_results, build_active_results, select_listing_items
+from benchmarks.fixtures import load_fixtures, fixture_kind, fixture_query
+
+FIXTURES = load_fixtures()
+RESULT_PAGES = sorted(name for name in FIXTURES if fixture_kind(name) != "block")
+BLOCK_PAGES = sorted(name for name in FIXTURES if fixture_kind(name) == "block")
+
+def build_results(backend, name):
+    html = FIXTURES[name]
+    sold = fixture_kind(name) == "sold"
+    build = build_sold_results if sold else build_active_results
+    with redirect_stdout(io.StringIO()):
+        return build(fixture_query(html), name, backend.extract(html, sold=sold))
+
+@pytest.mark.parametrize("name", RESULT_PAGES)
+def test_backends_agree_on_fixture(name):
+    expected = build_results(SoupBackend(), name)
+    actual = build_results(LxmlBackend(), name)
+    assert actual["raw"] == expected["raw"]
+    assert actual["filtered"] == expected["filtered"]
+
+def test_fixtures_cover_listings_and_empty_pages():
+    assert BLOCK_PAGES
+    assert any(build_results(SoupBackend(), name)["raw"] for name in RESULT_PAGES)
+    assert "sold_empty.html" in RESULT_PAGES
+
+def test_empty_results_page_has_no_listings():
+    for backend in (SoupBackend(), LxmlBackend()):
+        assert build_results(backend, "sold_empty.html")["raw"] == []
+        assert backend.extract("", sold=True) == []
+
+@pytest.mark.parametrize("name", BLOCK_PAGES)
+def test_blocked_page_is_rejected(name):
+    html = FIXTURES[name]
+    for backend in (SoupBackend(), LxmlBackend()):
+        assert backend.extract(html, sold=True) == []
+    with pytest.raises(Exception, match="blocked"):
+        select_listing_items(html, sold=True)
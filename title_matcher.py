@@ -0,0 +1,38 @@
+# title_matcher.py
+# Precompiled keyword matching for listing titles.
+# One alternation regex per keyword list replaces per-title `any(kw in title ...)` loops.
+
+import re
+
+class KeywordMatcher:
+    """
+    Matches lowercased titles against a keyword list in a single regex pass.
+    word_boundary=False behaves like `any(kw in title for kw in keywords)`;
+    word_boundary=True like `any(re.search(rf"\\b{kw}\\b", title) for kw in keywords)`.
+    """
+
+    def __init__(self, keywords, word_boundary=False):
+        self.keywords = sorted(set(k.lower() for k in keywords if k), key=len, reverse=True)
+        self.word_boundary = word_boundary
+        if not self.keywords:
+            self._regex = None
+            return
+        alternation = "|".join(re.escape(k) for k in self.keywords)
+        pattern = rf"\b(?:{alternation})\b" if word_boundary else alternation
+        self._regex = re.compile(pattern)
+
+    def matches(self, title_lower):
+        return self._regex is not None and self._regex.search(title_lower) is not None
+
+    def first_match(self, title_lower):
+        if self._regex is None:
+            return None
+        match = self._regex.search(title_lower)
+        return match.group(0) if match else None
+
+    def classify(self, titles):
+        # Batch API: one bool per title, True when any keyword matches
+        if self._regex is None:
+            return [False] * len(titles)
+        search = self._regex.search
+        return [search(title.lower()) is not None for title in titles]
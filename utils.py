@@ -1,4 +1,7 @@
 import re
+from collections import defaultdict
+from datetime import datetime
+from title_matcher import KeywordMatcher
 
 EXCLUDED_TERMS = [
     "psa", "bgs", "cgc", "graded", "beckett", "sgc",
@@ -7,6 +10,10 @@ EXCLUDED_TERMS = [
     "choose", "multi",
     "japanese", "german", "french", "italian", "spanish", "korean", "chinese"
 ]
+EXCLUDED_MATCHER = KeywordMatcher(EXCLUDED_TERMS)
+
+# Bulk/multi quantities like 2x, 3x, 4x etc.
+BULK_QUANTITY_PATTERN = re.compile(r"(?:^|\s)[2-9]x|x[2-9]|\dx\d")
 
 def filter_outliers(prices):
     if not prices:
@@ -34,6 +41,35 @@ def calculate_average(prices):
         return None
     return sum(prices) / len(prices)
 
+def summarize_daily_prices(listings, days=None):
+    """
+    Groups sold listings by sold_date (optionally only `days`) and returns
+    {date: {"median", "average", "count", "urls"}}, or {date: None} when
+    outlier filtering leaves nothing for that day.
+    """
+    grouped_by_date = defaultdict(list)
+    url_tracker = defaultdict(set)
+    for item in listings:
+        if days is not None and item["sold_date"] not in days:
+            continue
+        dt = datetime.strptime(item["sold_date"], "%Y-%m-%d").date()
+        grouped_by_date[dt].append(item["price"])
+        url_tracker[dt].add(item["url"])
+
+    summary = {}
+    for sold_date, prices in grouped_by_date.items():
+        filtered = filter_outliers(prices)
+        if not filtered:
+            summary[sold_date] = None
+            continue
+        summary[sold_date] = {
+            "median": calculate_median(filtered),
+            "average": calculate_average(filtered),
+            "count": len(filtered),
+            "urls": list(url_tracker[sold_date])
+        }
+    return summary
+
 def is_valid_price(price):
     return price is not None and price >= 0.50
 
@@ -43,11 +79,7 @@ def is_valid_condition(condition):
     lowered = condition.strip().lower()
     return lowered not in ["damaged", "poor"]
 
-def is_valid_title(title, character, digits):
-    lowered = title.lower()
-
-    if any(term in lowered for term in EXCLUDED_TERMS):
-        return False
+def _passes_card_checks(lowered, character, digits):
     if character and character not in lowered:
         return False
     if digits:
@@ -55,14 +87,27 @@ def is_valid_title(title, character, digits):
         if digits not in numeric:
             return False
 
-    # Block bulk/multi quantities like 2x, 3x, 4x etc.
-    if re.search(r"(?:^|\s)[2-9]x|x[2-9]|\dx\d", lowered):
+    if BULK_QUANTITY_PATTERN.search(lowered):
         return False
     if "&" in lowered or "+" in lowered:
         return False
 
     return True
 
+def is_valid_title(title, character, digits):
+    lowered = title.lower()
+    if EXCLUDED_MATCHER.matches(lowered):
+        return False
+    return _passes_card_checks(lowered, character, digits)
+
+def is_valid_titles(titles, character, digits):
+    # Batch form of is_valid_title for one card's page of listings
+    excluded = EXCLUDED_MATCHER.classify(titles)
+    return [
+        not is_excluded and _passes_card_checks(title.lower(), character, digits)
+        for title, is_excluded in zip(titles, excluded)
+    ]
+
 def detect_holo_type(title):
     lowered = title.lower()
     if "reverse holo" in lowered or "rev holo" in lowered or "rh" in lowered:
@@ -80,3 +125,15 @@ def parse_card_meta(query):
     card_number = number_match.group(0) if number_match else ""
     digits_only = re.sub(r"[^\d]", "", card_number)
     return character, digits_only
+
+def normalize_query(query):
+    return " ".join(query.split()).lower()
+
+def group_cards_by_query(cards):
+    # Cards whose search strings differ only by case/whitespace share one eBay fetch
+    groups = {}
+    for card in cards:
+        if not card.get("query"):
+            continue
+        groups.setdefault(normalize_query(card["query"]), []).append(card)
+    return groups
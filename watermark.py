@@ -0,0 +1,77 @@
+# watermark.py
+# Per-card incremental watermark for sold scraping:
+# the newest sold_date ingested plus the eBay item IDs already seen on that date.
+# Table: migrations/0004_ebay_sold_watermark.sql
+
+import re
+import json
+from datetime import datetime
+from sqlalchemy import text
+
+# Column order of watermark_rows(), for batched upserts keyed on unique_id
+WATERMARK_COLUMNS = ("unique_id", "last_sold_date", "seen_item_ids", "updated_at")
+
+ITEM_ID_PATTERN = re.compile(r"/itm/(?:[^/?]+/)?(\d+)")
+
+def item_id_from_url(url):
+    match = ITEM_ID_PATTERN.search(url or "")
+    return match.group(1) if match else url
+
+class Watermark:
+    def __init__(self, last_sold_date=None, seen_ids=None):
+        self.last_sold_date = last_sold_date
+        self.seen_ids = set(seen_ids or [])
+
+    def is_new(self, listing):
+        if self.last_sold_date is None:
+            return True
+        sold_date = listing["sold_date"]
+        last = self.last_sold_date.isoformat()
+        if sold_date > last:
+            return True
+        return sold_date == last and item_id_from_url(listing["url"]) not in self.seen_ids
+
+    def new_listings(self, listings):
+        return [listing for listing in listings if self.is_new(listing)]
+
+    def advanced(self, listings):
+        # Watermark after ingesting `listings` (which must already be new)
+        if not listings:
+            return self
+        newest = max(listing["sold_date"] for listing in listings)
+        newest_date = datetime.strptime(newest, "%Y-%m-%d").date()
+        seen = set(self.seen_ids) if newest_date == self.last_sold_date else set()
+        seen.update(item_id_from_url(l["url"]) for l in listings if l["sold_date"] == newest)
+        return Watermark(newest_date, seen)
+
+async def load_watermarks(session, unique_ids):
+    """
+    Watermarks for `unique_ids`. Cards without a row yet fall back to their newest
+    dailypricelog date with no seen IDs, so that whole day is re-read once.
+    """
+    ids = list(unique_ids)
+    result = await session.execute(text("""
+        SELECT unique_id, last_sold_date, seen_item_ids FROM ebay_sold_watermark
+        WHERE unique_id = ANY(:ids)
+    """), {"ids": ids})
+    watermarks = {uid: Watermark(last, seen) for uid, last, seen in result.fetchall()}
+
+    missing = [uid for uid in ids if uid not in watermarks]
+    if missing:
+        result = await session.execute(text("""
+            SELECT unique_id, MAX(sold_date::date) FROM dailypricelog
+            WHERE unique_id = ANY(:ids)
+            GROUP BY unique_id
+        """), {"ids": missing})
+        for uid, last in result.fetchall():
+            watermarks[uid] = Watermark(last)
+    return watermarks
+
+def watermark_rows(unique_id, watermark):
+    """
+    Upsert rows for `watermark`: none if it has no date yet (a card never seen with any listings),
+    since last_sold_date is NOT NULL and a failed insert would take the card's other writes with it.
+    """
+    if watermark is None or watermark.last_sold_date is None:
+        return []
+    return [(unique_id, watermark.last_sold_date, json.dumps(sorted(watermark.seen_ids)), datetime.utcnow())]
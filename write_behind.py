@@ -0,0 +1,161 @@
+# write_behind.py
+# Process-wide write-behind buffer for scraper output. Scrape tasks submit units of row writes
+# (a card's sold side, its active side, a null marker...) and get a future back; the buffer
+# merges everything pending into one COPY/upsert per table and commits it in one transaction,
+# on a small dedicated connection pool. Flushes happen by size, by time, and on close.
+# If a merged batch fails, its units are retried one savepoint each, so one bad card
+# doesn't take the rest of the batch down with it.
+
+import os
+import time
+import asyncio
+import traceback
+from collections import namedtuple
+
+from bulk_writer import bulk_insert, upsert_rows
+
+# === Config ===
+FLUSH_ROWS = int(os.getenv("WRITE_BEHIND_FLUSH_ROWS", "5000"))
+FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "2"))
+POOL_SIZE = int(os.getenv("WRITE_BEHIND_POOL_SIZE", "2"))
+
+# conflict_columns=None: plain insert (COPY where possible); otherwise upsert on those columns
+Write = namedtuple("Write", ["table", "columns", "rows", "conflict_columns"], defaults=[None])
+
+class _Unit:
+    def __init__(self, writes, label):
+        self.writes = [w for w in writes if w.rows]
+        self.label = label
+        self.future = asyncio.get_running_loop().create_future()
+        self.rows = sum(len(w.rows) for w in self.writes)
+
+class WriteBehindBuffer:
+    def __init__(self, session_factory, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._units = []
+        self._pending_rows = 0
+        self._lock = None
+        self._wake = None
+        self._task = None
+        self._closing = False
+        self.stats = {"flushes": 0, "units": 0, "rows": 0, "failed_units": 0, "flush_seconds": 0.0}
+
+    def _start(self):
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Write-behind flush error: {e}")
+                traceback.print_exc()
+
+    async def submit(self, writes, label=""):
+        """
+        Queues a unit of writes that must land together. Returns a future that resolves
+        to True once committed, False if the unit failed. Awaiting it is optional.
+        """
+        self._start()
+        unit = _Unit(writes, label)
+        self._units.append(unit)
+        self._pending_rows += unit.rows
+        if self._pending_rows >= self.flush_rows * 2:
+            # Writers outrunning Postgres: make this submitter wait for a flush
+            await self.flush()
+        elif self._pending_rows >= self.flush_rows:
+            self._wake.set()
+        return unit.future
+
+    async def flush(self):
+        if self._lock is None:
+            return
+        async with self._lock:
+            units, self._units, self._pending_rows = self._units, [], 0
+            if not units:
+                return
+            started = time.monotonic()
+            try:
+                await self._write_batch(units)
+                results = [True] * len(units)
+            except Exception as e:
+                print(f"⚠️ Write-behind batch of {len(units)} units failed ({e}); retrying one by one")
+                results = await self._write_units_separately(units)
+
+            for unit, ok in zip(units, results):
+                if not unit.future.done():
+                    unit.future.set_result(ok)
+            self.stats["flushes"] += 1
+            self.stats["units"] += len(units)
+            self.stats["rows"] += sum(u.rows for u in units)
+            self.stats["failed_units"] += results.count(False)
+            self.stats["flush_seconds"] += time.monotonic() - started
+
+    @staticmethod
+    async def _apply(session, writes):
+        # Same table/columns/conflict target -> one statement, in first-submitted order
+        merged = {}
+        for w in writes:
+            merged.setdefault((w.table, w.columns, w.conflict_columns), []).extend(w.rows)
+        for (table, columns, conflict_columns), rows in merged.items():
+            if conflict_columns:
+                await upsert_rows(session, table, columns, rows, conflict_columns)
+            else:
+                await bulk_insert(session, table, columns, rows)
+
+    async def _write_batch(self, units):
+        async with self.session_factory() as session:
+            await self._apply(session, [w for u in units for w in u.writes])
+            await session.commit()
+
+    async def _write_units_separately(self, units):
+        results = []
+        async with self.session_factory() as session:
+            for unit in units:
+                try:
+                    async with session.begin_nested():
+                        await self._apply(session, unit.writes)
+                    results.append(True)
+                except Exception as e:
+                    print(f"❌ Write-behind unit failed {unit.label}: {e}")
+                    results.append(False)
+            try:
+                await session.commit()
+            except Exception as e:
+                print(f"❌ Write-behind commit failed: {e}")
+                traceback.print_exc()
+                results = [False] * len(units)
+        return results
+
+    async def close(self):
+        """Final flush; call before the event loop (or the engine) goes away."""
+        if self._task is None:
+            return
+        # Let the loop finish its current flush rather than cancelling a write mid-statement
+        self._closing = True
+        self._wake.set()
+        await self._task
+        await self.flush()
+        self._task = None
+        self._closing = False
+        s = self.stats
+        print(
+            f"💾 Write-behind: {s['units']} units / {s['rows']} rows in {s['flushes']} flushes "
+            f"({s['flush_seconds']:.1f}s), {s['failed_units']} failed"
+        )
+
+def resolved(ok=True):
+    """An already-finished result, for units that were never submitted."""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(ok)
+    return future